@@ -28,12 +28,15 @@ from pyproj import CRS #For CRS (Coordinate Reference System) functions
 from shapely.geometry import Point, MultiPoint #Required for point/polygon geometry
 from shapely.ops import nearest_points #Required for nearest neighbor analysis
 import contextily as ctx #Used in conjuction with matplotlib/geopandas to set a basemap
-from geopy import distance #For geodesic distance calculation (radians to meters)
 
 
 #from matplotlib import rc
 #rc('text', usetex=True)
 #rc('text.latex', preamble=r'\usepackage{color}')
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
+from geometry_pyramid import plot_districts #Plots the districts at the level of detail of the output
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -171,28 +174,11 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
-
-#Istanbul geospatial districts data
-istanbul_districts_fp = "../../../Data/GIS data/Processed/istanbul_districts.shp"
-istanbul_districts = gpd.read_file(istanbul_districts_fp, )
+#Istanbul geospatial districts data, with the number of institutions in each district
+istanbul_districts = data_access.districts_with_counts("institutions").rename(columns = {"count": "health_count"})
 
 #%% --- Data Preparation ---
 
-
-#Create for English
-h_inst_per_district_eng = health.loc[:,"district_eng"].value_counts().sort_values(ascending = False).reset_index()
-h_inst_per_district_eng.rename(columns = {"index" : "district_e",
-                                       "district_eng" : "health_count"},
-                                        inplace = True) 
-
-#Merge with geodataframe
-istanbul_districts = istanbul_districts.merge(h_inst_per_district_eng,
-                                               on = "district_e",
-                                               how = "left")
-
 #Now, this information can be used for both TR and eng
 
 #%% --- Visualization - English ---
@@ -207,7 +193,8 @@ ax_1 = fig.add_subplot(1,1,1)
 
 # --- Plot Figure ---
 
-istanbul_districts.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts, ax_1, dpi = 300,
                     column = "health_count",
                     edgecolor = "black",
                     alpha = 1,
@@ -273,7 +260,8 @@ ax_1 = fig.add_subplot(1,1,1)
 
 # --- Plot Figure ---
 
-istanbul_districts.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts, ax_1, dpi = 300,
                     column = "health_count",
                     edgecolor = "black",
                     alpha = 1,
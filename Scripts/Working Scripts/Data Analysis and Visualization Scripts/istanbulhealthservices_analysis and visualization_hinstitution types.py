@@ -30,6 +30,9 @@ import os
 #from matplotlib import rc
 #rc('text', usetex=True)
 #rc('text.latex', preamble=r'\usepackage{color}')
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -161,9 +164,10 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data, only the columns used below
+health = data_access.health(columns = ["institution_type",
+                                "institution_type_abbrv_eng",
+                                "institution_type_abbrv_tr"])
 
 #%% --- Data Preparation ---
 
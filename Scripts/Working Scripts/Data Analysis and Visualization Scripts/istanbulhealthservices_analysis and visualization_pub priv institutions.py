@@ -24,6 +24,9 @@ import matplotlib.pyplot as plt #For plotting
 import matplotlib.cm as cm
 import matplotlib.colors as col
 import os
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -160,9 +163,10 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data, only the columns used below
+health = data_access.health(columns = ["institution_type",
+                                "institution_type_eng",
+                                "private_or_public"])
 
 
 #%% --- Data Preparation ---
@@ -175,8 +179,10 @@ health_public = grouped_by_privpublic.get_group("Public")
 health_private = grouped_by_privpublic.get_group("Private")
 
 #Get the institution_types vcounts private institutions
-health_private_vcounts_eng = health_private.loc[:,"institution_type_eng"].value_counts()
-health_private_vcounts_tr = health_private.loc[:,"institution_type"].value_counts()
+#(The type columns are categoricals, drop the types that are not in this group
+#or they would be counted as zeros)
+health_private_vcounts_eng = health_private.loc[:,"institution_type_eng"].cat.remove_unused_categories().value_counts()
+health_private_vcounts_tr = health_private.loc[:,"institution_type"].cat.remove_unused_categories().value_counts()
 
 #Create a mask out of hinstitutions that are private
 health_private_instype_mask = health_public.loc[:,"institution_type"].isin(health_private_vcounts_tr.index)
@@ -185,9 +191,9 @@ health_private_instype_mask = health_public.loc[:,"institution_type"].isin(healt
 health_public_pubcountepart = health_public.loc[health_private_instype_mask,:]
 
 #TR - Get the institution_types vcounts for public instiutions
-health_public_pubcountepart_vcounts_tr = health_public_pubcountepart.loc[:,"institution_type"].value_counts()
+health_public_pubcountepart_vcounts_tr = health_public_pubcountepart.loc[:,"institution_type"].cat.remove_unused_categories().value_counts()
 #ENG - Get the institution_types vcounts for public instiutions
-health_public_pubcountepart_vcounts_eng = health_public_pubcountepart.loc[:,"institution_type_eng"].value_counts()
+health_public_pubcountepart_vcounts_eng = health_public_pubcountepart.loc[:,"institution_type_eng"].cat.remove_unused_categories().value_counts()
 
 #Merge datsets
 health_merged_eng = pd.merge(left = health_private_vcounts_eng.reset_index(),
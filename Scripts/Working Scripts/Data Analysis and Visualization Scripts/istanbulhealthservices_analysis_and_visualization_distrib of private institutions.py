@@ -38,9 +38,12 @@ from pyproj import CRS #For CRS (Coordinate Reference System) functions
 from shapely.geometry import Point, MultiPoint #Required for point/polygon geometry
 from shapely.ops import nearest_points #Required for nearest neighbor analysis
 import contextily as ctx #Used in conjuction with matplotlib/geopandas to set a basemap
-from geopy import distance #For geodesic distance calculation (radians to meters)
 import os
 from scipy import stats as st
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
+from geometry_pyramid import plot_districts #Plots the districts at the level of detail of the output
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -176,59 +179,21 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
-
-
-#Istanbul geospatial districts data
-istanbul_districts_fp = "../../../Data/GIS data/Processed/istanbul_districts.shp"
-istanbul_districts = gpd.read_file(istanbul_districts_fp)
-
-#Istanbul districts extra data
-districts_extra_fp = "../../../Data/Non-GIS Data/external/district_income.xlsx"
-districts_extra = pd.read_excel(districts_extra_fp)
+#Istanbul geospatial districts data, with the districts extra data and the
+#number of private institutions in each district
+istanbul_districts_merged = data_access.districts_with_counts("private").rename(columns = {"count": "private_count"})
 
 #%% --- Data Preparation ---
 
 # --- Private hcare institution per district ---
 
-#Create a boolean indexing mask
-priv_mask = health.loc[:,"private_or_public"] == "Private"
-
-#Select by mask + groupby
-priv_only_grouped = health.loc[priv_mask,:].groupby("district_eng")
-
-#Get value counts from the grouped object
-priv_only_count = priv_only_grouped["private_or_public"].value_counts()
-
-#Join with districts_extra
-
-districts_private_and_income = pd.merge(priv_only_count,districts_extra,
-                                        how = "right",
-                                        on = "district_eng")
-
-#REPLACE NAN WITH 0!
-
-districts_private_and_income.loc[:,"private_or_public"].fillna(0, inplace = True)
-
-#Join with geodataframe
-
-#Fix some naming problems
-extract = districts_private_and_income.loc[:,["district_eng",
-                                              "private_or_public","yearly_average_household_income"]]
-
-extract.rename(columns = {"district_eng" :"district_e",
-                          "private_or_public" : "private_count"},
-                           inplace = True)
-
-istanbul_districts_merged = istanbul_districts.merge(extract,
-                                               on = "district_e",
-                                               how = "left")
-
-#REPLACE NAN WITH 0!
+#The same without the geometries, for the scatterplots
+#(the count is named private_or_public, which the figures below read it from)
+districts_private_and_income = pd.DataFrame(istanbul_districts_merged.drop(columns = "geometry"))
+districts_private_and_income.rename(columns = {"district_e": "district_eng",
+                                               "private_count": "private_or_public"},
+                                    inplace = True)
 
-istanbul_districts_merged.loc[:,"private_count"].fillna(0, inplace = True)
 #%% ================ VERSION ONE ======================
 #%% --- Visualization - English ---
 
@@ -253,7 +218,8 @@ ax_3 = fig.add_subplot(gs[1,1])
 # --- Plotting ---
 
 #       --- Ax_1 : Map ---
-istanbul_districts_merged.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts_merged, ax_1, dpi = 300,
                     column = "private_count",
                     edgecolor = "black",
                     alpha = 1,
@@ -274,10 +240,10 @@ districts_to_label_list = ["Silivri", "Catalca", "Buyukcekmece", "Arnavutkoy", "
                            "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 #Create a boolean indexing mask checking for those districts
-labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 #Pass in the boolean mask to create a dataframe
-districts_to_label = istanbul_districts.loc[labels_mask,["district_e", "geometry"]]
+districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_e", "geometry"]]
 
 #Create a representative point within each district polygon to place the label
 districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
@@ -477,7 +443,8 @@ ax_3 = fig.add_subplot(gs[1,1])
 # --- Plotting ---
 
 #       --- Ax_1 : Map ---
-istanbul_districts_merged.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts_merged, ax_1, dpi = 300,
                     column = "private_count",
                     edgecolor = "black",
                     alpha = 1,
@@ -498,10 +465,10 @@ districts_to_label_list = ["Silivri", "Catalca", "Buyukcekmece", "Arnavutkoy", "
                            "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 #Create a boolean indexing mask checking for those districts
-labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 #Pass in the boolean mask to create a dataframe
-districts_to_label = istanbul_districts.loc[labels_mask,["district_t", "geometry"]]
+districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_t", "geometry"]]
 
 #Create a representative point within each district polygon to place the label
 districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
@@ -727,10 +694,10 @@ plt.savefig(export_path, format = "png", dpi = 300, bbox_inches="tight")
 #                             "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 # #Create a boolean indexing mask checking for those districts
-# labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+# labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 # #Pass in the boolean mask to create a dataframe
-# districts_to_label = istanbul_districts.loc[labels_mask,["district_e", "geometry"]]
+# districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_e", "geometry"]]
 
 # #Create a representative point within each district polygon to place the label
 # districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
@@ -977,10 +944,10 @@ plt.savefig(export_path, format = "png", dpi = 300, bbox_inches="tight")
 #                             "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 # #Create a boolean indexing mask checking for those districts
-# labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+# labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 # #Pass in the boolean mask to create a dataframe
-# districts_to_label = istanbul_districts.loc[labels_mask,["district_t", "geometry"]]
+# districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_t", "geometry"]]
 
 # #Create a representative point within each district polygon to place the label
 # districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
@@ -30,7 +30,13 @@ from pyproj import CRS #For CRS (Coordinate Reference System) functions
 from shapely.geometry import Point, MultiPoint #Required for point/polygon geometry
 from shapely.ops import nearest_points #Required for nearest neighbor analysis
 import contextily as ctx #Used in conjuction with matplotlib/geopandas to set a basemap
-from geopy import distance #For geodesic distance calculation (radians to meters)
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
+from geometry_pyramid import plot_districts #Plots the districts at the level of detail of the output
+from district_correlations import lookup_correlation #Looks r values up in the correlation results
+import project_paths #Filepaths of the data
+
 #%% --- Dynamically create a directory named after the file for outputs ---
 
 #Get the absolute filepath
@@ -165,17 +171,21 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data, only the columns used below
+health = data_access.health(columns = ["district_tr",
+                                "private_or_public",
+                                "care_type",
+                                "latitude",
+                                "longitude"])
 
-#Istanbul geospatial districts data
-istanbul_districts_fp = "../../../Data/GIS data/Processed/istanbul_districts.shp"
-istanbul_districts = gpd.read_file(istanbul_districts_fp)
+#Istanbul geospatial districts data, with the districts extra data and the
+#number of low level care institutions in each district
+istanbul_districts_merged = data_access.districts_with_counts("low level")
 
-#Istanbul districts extra data
-districts_extra_fp = "../../../Data/Non-GIS Data/external/district_income.xlsx"
-districts_extra = pd.read_excel(districts_extra_fp)
+#Correlations of the institution counts of each care type with the district
+#covariates, made by district_correlations.py
+correlations_fp = project_paths.care_type_correlations_fp
+correlations = pd.read_csv(correlations_fp)
 
 
 #%% --- Data Preparation ---
@@ -189,38 +199,19 @@ health_low_level = health.loc[low_level_mask,:]
 #How many first-step health care institutions are private vs. public?
 private_vs_public = health_low_level.loc[:,"private_or_public"].value_counts()
 
-#Distribution across districts
-district_inst_count = health_low_level.loc[:,"district_tr"].value_counts().rename_axis("district_tr").reset_index(name = "count")
+#Distribution across districts: the count and the count normalized by
+#population come with the districts (data_access.districts_with_counts).
+#The figures below read them from a plain dataframe.
+districts_with_inst_count = pd.DataFrame(istanbul_districts_merged.drop(columns = "geometry"))
 
 #Does this correlate with population ?
 
-    #Merge into an intermediary dataframe
-districts_with_inst_count = pd.merge(districts_extra,
-                                     district_inst_count,
-                                     how = "left",
-                                     on = "district_tr")
-    
-r1 = st.pearsonr(districts_with_inst_count["population"],
-                 districts_with_inst_count["count"])[0]
+r1 = lookup_correlation(correlations, "low level", "population", group_axis = "care_type")
 
 #Does this correlate with income ?
 
-r2 = st.pearsonr(districts_with_inst_count["yearly_average_household_income"],
-                 districts_with_inst_count["count"])[0]
-
-
-#Distribution across district normalized by population
-districts_with_inst_count.loc[:,"normalized_count"] = districts_with_inst_count.loc[:,"count"] / districts_with_inst_count.loc[:,"population"]
-
-#Merge with districts
-
-districts_with_inst_count.rename(columns = {"district_eng":"district_e"},
-                                inplace = True)
+r2 = lookup_correlation(correlations, "low level", "yearly_average_household_income", group_axis = "care_type")
 
-istanbul_districts_merged = pd.merge(left = istanbul_districts,
-                                     right = districts_with_inst_count,
-                                     how = "left",
-                                     on = "district_e")
 #%%  --- Visualization - English ---
 
 # --- Figure Preparation ---
@@ -247,7 +238,8 @@ ax_4 = fig.add_subplot(gs[3,2:])
 # --- Plotting ---
 
 #       --- Ax_1 : Map ---
-istanbul_districts_merged.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts_merged, ax_1, dpi = 300,
                     column = "count",
                     edgecolor = "black",
                     alpha = 1,
@@ -268,10 +260,10 @@ districts_to_label_list = ["Silivri", "Catalca", "Buyukcekmece", "Arnavutkoy", "
                             "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 #Create a boolean indexing mask checking for those districts
-labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 #Pass in the boolean mask to create a dataframe
-districts_to_label = istanbul_districts.loc[labels_mask,["district_e", "geometry"]]
+districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_e", "geometry"]]
 
 #Create a representative point within each district polygon to place the label
 districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
@@ -494,7 +486,8 @@ ax_4 = fig.add_subplot(gs[3,2:])
 # --- Plotting ---
 
 #       --- Ax_1 : Map ---
-istanbul_districts_merged.plot(ax = ax_1,
+#Simplified polygons, detailed enough for the 300 dpi png (the svg has the same shapes)
+plot_districts(istanbul_districts_merged, ax_1, dpi = 300,
                     column = "count",
                     edgecolor = "black",
                     alpha = 1,
@@ -515,10 +508,10 @@ districts_to_label_list = ["Silivri", "Catalca", "Buyukcekmece", "Arnavutkoy", "
                             "Beykoz", "Sile", "Cekmekoy", "Tuzla", "Pendik", "Maltepe", "Basaksehir"]
 
 #Create a boolean indexing mask checking for those districts
-labels_mask = istanbul_districts.loc[:,"district_e"].isin(districts_to_label_list)
+labels_mask = istanbul_districts_merged.loc[:,"district_e"].isin(districts_to_label_list)
 
 #Pass in the boolean mask to create a dataframe
-districts_to_label = istanbul_districts.loc[labels_mask,["district_t", "geometry"]]
+districts_to_label = istanbul_districts_merged.loc[labels_mask,["district_t", "geometry"]]
 
 #Create a representative point within each district polygon to place the label
 districts_to_label["representative_point"] = districts_to_label.geometry.representative_point().geometry.values
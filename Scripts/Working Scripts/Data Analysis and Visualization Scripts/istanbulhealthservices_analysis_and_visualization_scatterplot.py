@@ -25,6 +25,12 @@ import matplotlib.cm as cm
 import matplotlib.colors as col
 import os
 from scipy import stats as st
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
+from district_correlations import lookup_correlation #Looks r values up in the correlation results
+import project_paths #Filepaths of the data
+
 #%% --- Dynamically create a directory named after the file for outputs ---
 
 #Get the absolute filepath
@@ -159,128 +165,45 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data, counted by district, institution type,
+#ownership and care type (count_cube.py)
+count_cube = data_access.count_cube()
 
 #Istanbul extra district data
-districts_extra_fp = "../../../Data/Non-GIS Data/external/district_income.xlsx"
-districts_extra = pd.read_excel(districts_extra_fp)
+districts_extra = data_access.district_covariates()
 
-#%% --- Data Preparation ---
+#Correlations of the institution counts with the district covariates,
+#made by district_correlations.py
+correlations_fp = project_paths.district_correlations_fp
+correlations = pd.read_csv(correlations_fp)
 
-# =======================================================================
-# --- IMPORTANT!: The below code is not my proudest piece of code.
-# I know that it contains many redundancies and it is not he cleanest code.
-# However, i wrote this in a time where i was quite stressed so please do
-# excuse me. I will return to re-factor it when i have time
-# =======================================================================
+#%% --- Data Preparation ---
 
 #Create a list of institutions that you want to include in your analysis
 institutions = ["Hospital", "Dental Health Center", "Dialysis Center",
                 "Physical Therapy Center", "Gynecology and Obstetrics Clinic",
                 "Medical Center", "Polyclinic","Planned Parenthood Center"]
 
-#Create a mask based on that list
-institutions_mask = health.loc[:,"institution_type_eng"].isin(institutions)
-
-#Select health institutions that are only in the boolean mask
-selected = health.loc[institutions_mask, ["district_tr", "district_eng",
-                                          "institution_type", "institution_type_eng",
-                                          "private_or_public"]]
-
-#Create a list of districts
-#This will exclude districts that do not have any of the health institutions
-#i have listed above.
-districts = selected.loc[:,"district_eng"].value_counts().index.tolist()
-
-#Groupby per district
-selected_groupby_dist = selected.groupby("district_eng")
-
-#For district in list of districts
-for district in districts:
-
-    #Make current group district
-    current_district = selected_groupby_dist.get_group(str(district))
-    
-    current_district_grouped = current_district.groupby("institution_type_eng")
-    
-    #Create a mask for the current district
-    current_district_mask = districts_extra.loc[:,"district_eng"] == str(district)
-
-    #For inst in list of institutions
-    for inst in institutions:
-        #Make current institution institution
-        try:
-            current_institution = current_district_grouped.get_group(str(inst))
-        except:
-            pass
-
-        #Value counts to get private and state info
-
-        info = current_institution.loc[:,"private_or_public"].value_counts()
-            
-        info_indexes = info.index.tolist()
-        
-        info_data = []
-        
-        if "Private" in info_indexes:
-            info_data.append(info["Private"])
-        if "Private" not in info_indexes:
-            info_data.append(int(0))
-        if "Public" in info_indexes:
-            info_data.append(info["Public"])
-        else:
-            info_data.append(int(0))
-        
-        #Pass mask to districts extra and assign values
-        districts_extra.loc[current_district_mask,str(inst) + "_private"] = info_data[0]
-        districts_extra.loc[current_district_mask,str(inst) + "_public"] = info_data[1]
-
-#Fill nan values with a tuple of 0,0
-districts_extra.fillna(0, inplace = True)
-
-#For each institution in institutions 
+#For each institution, a (private, public) count tuple per district
+#(the cube has every district, with 0 where there is none of the institution)
 for institution in institutions:
-    
-    #Recreate districts_extra dataframe keys
-    institution_priv_str = institution + "_private"
-    institution_pub_str = institution + "_public"
-    
-    #Zip dataframe values as a tuple
-    list_zip = list(zip(districts_extra.loc[:,institution_priv_str], districts_extra.loc[:,institution_pub_str]))
-    
-    #Assign the tuple to the corresponding column
-    districts_extra[str(institution + "_privpub_count")] = list_zip
-    
-    #Drop the original two columns and leave only the tuple columns
-    districts_extra.drop(columns = [institution_priv_str, institution_pub_str],
-                         axis = 1,
-                         inplace = True)
-    
-#Finally, fill nan values with a tuple of 0,0
+    privpub_count = count_cube.table("district_eng", "private_or_public",
+                                     institution_type_eng = institution)
+    privpub_count = privpub_count.reindex(districts_extra.loc[:,"district_eng"], fill_value = 0)
+    districts_extra[institution + "_privpub_count"] = list(zip(privpub_count.loc[:,"Private"],
+                                                               privpub_count.loc[:,"Public"]))
 
 # --- Private hcare institution per district ---
 
-#Create a boolean indexing mask
-priv_mask = health.loc[:,"private_or_public"] == "Private"
-
-#Select by mask + groupby
-priv_only_grouped = health.loc[priv_mask,:].groupby("district_eng")
-
-#Get value counts from the grouped object
-priv_only_count = priv_only_grouped["private_or_public"].value_counts()
+#Private institutions of any type, per district
+#(named private_or_public, which the figures below read the counts from)
+priv_only_count = count_cube.table("district_eng", private_or_public = "Private").rename("private_or_public")
 
 #Join with districts_extra
-
 districts_private_and_income = pd.merge(priv_only_count,districts_extra,
                                         how = "right",
                                         on = "district_eng")
 
-#REPLACE NAN WITH 0!
-
-districts_private_and_income.loc[:,"private_or_public"].fillna(0, inplace = True)
-
 
 
 #%% --- Visualization - English ---
@@ -379,9 +302,9 @@ for ax in small_axes:
     x_values = sorted_df.loc[:,"yearly_average_household_income"]
     y_values = [x[0] for x in sorted_df.loc[:, current_inst_label]]
     
-    #Calculate pearson
+    #Look pearson's r up
     
-    pearson_r = st.pearsonr(x_values, y_values)[0]
+    pearson_r = lookup_correlation(correlations, current_inst, "yearly_average_household_income", ownership = "Private")
     
     # Annotate those who are non-linear
     
@@ -572,9 +495,9 @@ for ax in small_axes:
     x_values = sorted_df.loc[:,"yearly_average_household_income"]
     y_values = [x[0] for x in sorted_df.loc[:, current_inst_label]]
     
-    #Calculate pearson
+    #Look pearson's r up
     
-    pearson_r = st.pearsonr(x_values, y_values)[0]
+    pearson_r = lookup_correlation(correlations, current_inst, "yearly_average_household_income", ownership = "Private")
     
     # Annotate those who are non-linear
     
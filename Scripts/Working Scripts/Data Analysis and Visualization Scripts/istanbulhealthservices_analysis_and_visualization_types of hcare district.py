@@ -25,6 +25,11 @@ import matplotlib.cm as cm
 import matplotlib.colors as col
 import os
 from scipy import stats as st
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
+from district_correlations import lookup_correlation #Looks r values up in the correlation results
+import project_paths #Filepaths of the data
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -160,105 +165,32 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data, counted by district, institution type,
+#ownership and care type (count_cube.py)
+count_cube = data_access.count_cube()
 
 #Istanbul districts extra data
-districts_extra_fp = "../../../Data/Non-GIS Data/external/district_income.xlsx"
-districts_extra = pd.read_excel(districts_extra_fp)
+districts_extra = data_access.district_covariates()
+
+#Correlations of the institution counts with the district covariates,
+#made by district_correlations.py
+correlations_fp = project_paths.district_correlations_fp
+correlations = pd.read_csv(correlations_fp)
 
 #%% --- Data Preparation ---
-# =======================================================================
-# --- IMPORTANT!: The below code is not my proudest piece of code.
-# I know that it contains many redundancies and it is not he cleanest code.
-# However, i wrote this in a time where i was quite stressed so please do
-# excuse me. I will return to re-factor it when i have time
-# =======================================================================
 
 #Create a list of institutions that you want to include in your analysis
 institutions = ["Hospital", "Dental Health Center", "Dialysis Center",
                      "Physical Therapy Center", "Gynecology and Obstetrics Clinic"]
 
-#Create a mask based on that list
-institutions_mask = health.loc[:,"institution_type_eng"].isin(institutions)
-
-#Select health institutions that are only in the boolean mask
-selected = health.loc[institutions_mask, ["district_tr", "district_eng",
-                                          "institution_type", "institution_type_eng",
-                                          "private_or_public"]]
-
-#Create a list of districts
-#This will exclude districts that do not have any of the health institutions
-#i have listed above.
-districts = selected.loc[:,"district_eng"].value_counts().index.tolist()
-
-#Groupby per district
-selected_groupby_dist = selected.groupby("district_eng")
-
-#For district in list of districts
-for district in districts:
-
-    #Make current group district
-    current_district = selected_groupby_dist.get_group(str(district))
-    
-    current_district_grouped = current_district.groupby("institution_type_eng")
-    
-    #Create a mask for the current district
-    current_district_mask = districts_extra.loc[:,"district_eng"] == str(district)
-
-    #For inst in list of institutions
-    for inst in institutions:
-        #Make current institution institution
-        try:
-            current_institution = current_district_grouped.get_group(str(inst))
-        except:
-            pass
-
-        #Value counts to get private and state info
-
-        info = current_institution.loc[:,"private_or_public"].value_counts()
-            
-        info_indexes = info.index.tolist()
-        
-        info_data = []
-        
-        if "Private" in info_indexes:
-            info_data.append(info["Private"])
-        if "Private" not in info_indexes:
-            info_data.append(int(0))
-        if "Public" in info_indexes:
-            info_data.append(info["Public"])
-        else:
-            info_data.append(int(0))
-        
-        #Pass mask to districts extra and assign values
-        districts_extra.loc[current_district_mask,str(inst) + "_private"] = info_data[0]
-        districts_extra.loc[current_district_mask,str(inst) + "_public"] = info_data[1]
-
-#Fill nan values with a tuple of 0,0
-districts_extra.fillna(0, inplace = True)
-
-#For each institution in institutions 
+#For each institution, a (private, public) count tuple per district
+#(the cube has every district, with 0 where there is none of the institution)
 for institution in institutions:
-    
-    #Recreate districts_extra dataframe keys
-    institution_priv_str = institution + "_private"
-    institution_pub_str = institution + "_public"
-    
-    #Zip dataframe values as a tuple
-    list_zip = list(zip(districts_extra.loc[:,institution_priv_str], districts_extra.loc[:,institution_pub_str]))
-    
-    #Assign the tuple to the corresponding column
-    districts_extra[str(institution + "_privpub_count")] = list_zip
-    
-    #Drop the original two columns and leave only the tuple columns
-    districts_extra.drop(columns = [institution_priv_str, institution_pub_str],
-                         axis = 1,
-                         inplace = True)
-    
-#Finally, fill nan values with a tuple of 0,0
-
+    privpub_count = count_cube.table("district_eng", "private_or_public",
+                                     institution_type_eng = institution)
+    privpub_count = privpub_count.reindex(districts_extra.loc[:,"district_eng"], fill_value = 0)
+    districts_extra[institution + "_privpub_count"] = list(zip(privpub_count.loc[:,"Private"],
+                                                               privpub_count.loc[:,"Public"]))
 
 #%%FIGURE -- HOSPITAL
 selected_inst = "Hospital"
@@ -380,8 +312,7 @@ ax_2.set_xlabel("Average yearly household income (thousand TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
               xycoords=ax_2.transAxes,
@@ -421,8 +352,7 @@ ax_3.set_xlabel("Population",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -571,8 +501,7 @@ ax_2.set_xlabel("Yıllık ortalama hanehalkı geliri (bin TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -612,8 +541,7 @@ ax_3.set_xlabel("Nüfus",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -766,8 +694,7 @@ ax_2.set_xlabel("Average yearly household income (thousand TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -808,8 +735,7 @@ ax_3.set_xlabel("Population",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -958,8 +884,7 @@ ax_2.set_xlabel("Yıllık ortalama hanehalkı geliri (bin TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1000,8 +925,7 @@ ax_3.set_xlabel("Nüfus",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1154,8 +1078,7 @@ ax_2.set_xlabel("Average yearly household income (thousand TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1196,8 +1119,7 @@ ax_3.set_xlabel("Population",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1346,8 +1268,7 @@ ax_2.set_xlabel("Yıllık ortalama hanehalkı geliri (bin TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1388,8 +1309,7 @@ ax_3.set_xlabel("Nüfus",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1542,8 +1462,7 @@ ax_2.set_xlabel("Average yearly household income (thousand TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1584,8 +1503,7 @@ ax_3.set_xlabel("Population",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1734,8 +1652,7 @@ ax_2.set_xlabel("Yıllık ortalama hanehalkı geliri (bin TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1776,8 +1693,7 @@ ax_3.set_xlabel("Nüfus",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1930,8 +1846,7 @@ ax_2.set_xlabel("Average yearly household income (thousand TL)",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -1972,8 +1887,7 @@ ax_3.set_xlabel("Population",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -2125,8 +2039,7 @@ ax_2.set_ylabel("Kadın hast. ve sağlığı m. sayısı",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"yearly_average_household_income"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "yearly_average_household_income", ownership = "Private")
 
 ax_2.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
@@ -2167,8 +2080,7 @@ ax_3.set_xlabel("Nüfus",
 
 #Annotate pearson's r
     
-pearson_r = st.pearsonr(sorted_df.loc[:,"population"],
-                        bar_heights_priv)[0]
+pearson_r = lookup_correlation(correlations, selected_inst, "population", ownership = "Private")
 
 ax_3.annotate(s = "r = {:.2f}".format(pearson_r),
               xy = (.9, .9),
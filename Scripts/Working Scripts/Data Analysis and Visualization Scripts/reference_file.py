@@ -28,7 +28,9 @@ from pyproj import CRS #For CRS (Coordinate Reference System) functions
 from shapely.geometry import Point, MultiPoint #Required for point/polygon geometry
 from shapely.ops import nearest_points #Required for nearest neighbor analysis
 import contextily as ctx #Used in conjuction with matplotlib/geopandas to set a basemap
-from geopy import distance #For geodesic distance calculation (radians to meters)
+import sys
+sys.path.append("../Data Cleaning and Transformation Scripts") #For the shared data modules
+import data_access #Memoized data sources and joins, shared by the scripts
 
 #%% --- Dynamically create a directory named after the file for outputs ---
 
@@ -164,17 +166,15 @@ emphasis_color = cm.Set2.colors[2]
 
 #%% --- Read in the datasets ---
 
-#Istanbul health services data
-health_fp = "../../../Data/Non-GIS Data/cleaned/istanbul_healthservices_cleaned.csv"
-health = pd.read_csv(health_fp)
+#Istanbul health services data (pass columns = [...] to read only what you need)
+health = data_access.health()
 
 #Istanbul airbnb data
 airbnb_fp = ("../../../Data/Non-GIS Data/cleaned/istanbul_airbnb_cleaned.csv")
 airbnb = pd.read_csv(airbnb_fp)
 
 #Istanbul geospatial districts data
-istanbul_districts_fp = "../../../Data/GIS data/Processed/istanbul_districts.shp"
-istanbul_districts = gpd.read_file(istanbul_districts_fp, )
+istanbul_districts = data_access.districts()
 
 #Istanbul hair clinics data
 
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:18 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module turns the facility points into coverage maps: for every cell of
+a regular grid (100 m by default) over Istanbul's land, the distance to the
+nearest facility of each care type.
+
+The maps so far show how many institutions a district has. A district can
+have many institutions packed into one corner and none in the rest, which a
+count can not show. A distance surface can.
+
+How it works:
+    - The grid is laid out in UTM zone 35N (EPSG:32635), so the cells are
+    square in metres. The districts' extent sets its size (analysis_grid.py).
+    - The grid is processed in tiles (512 x 512 cells by default), so the
+    memory use does not depend on the resolution.
+    - The cell centres of a tile are located in the district polygons with the
+    DistrictLocator of district_assignment.py. Cells that are in no district
+    (sea, neighbouring provinces) are left empty.
+    - The nearest facility of each care type is found with the FacilityIndex
+    of nearest_facility.py (haversine distance, in metres).
+    - Each care type's distances are written to a compressed float32 GeoTIFF,
+    tile by tile.
+    - For the district summaries each tile is added to a histogram of 10 m
+    bins per district, so the mean is exact and the 90th percentile is
+    within 10 m, without keeping every cell in memory.
+
+The whole city at 100 m (about 600k land cells, 4 care types) takes a few
+seconds.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from pyproj import Transformer
+
+from district_layer import load_districts
+from district_assignment import istanbul_district_locator
+from nearest_facility import FacilityIndex
+from analysis_grid import grid_spec, iter_tiles, tile_cell_centres
+import project_paths
+
+#%% --- The grid ---
+
+#%% --- Rasters ---
+
+def care_type_slug(care_type):
+    #"hospital level" -> "hospital_level", used in the filenames
+    return care_type.strip().lower().replace(" ", "_")
+
+
+def open_distance_raster(fp, spec, tile_size = 512):
+    """Open a tiled, compressed float32 GeoTIFF for one care type's distances."""
+    return rasterio.open(fp, "w",
+                         driver = "GTiff",
+                         width = spec["width"],
+                         height = spec["height"],
+                         count = 1,
+                         dtype = "float32",
+                         crs = spec["crs"],
+                         transform = from_origin(spec["origin_x"], spec["origin_y"],
+                                                 spec["cell_size"], spec["cell_size"]),
+                         nodata = np.nan,
+                         tiled = True,
+                         blockxsize = min(tile_size, 512),
+                         blockysize = min(tile_size, 512),
+                         compress = "deflate",
+                         predictor = 3)
+
+#%% --- District summaries ---
+
+class DistanceHistogram:
+    """Accumulate distances per district into fixed-width bins."""
+
+    def __init__(self, n_districts, bin_size = 10):
+        self.n_districts = n_districts
+        self.bin_size = bin_size
+        self.counts = np.zeros((n_districts, 0), dtype = "int64")
+        self.sums = np.zeros(n_districts)
+
+    def update(self, district_positions, distances):
+        bins = (distances // self.bin_size).astype("int64")
+        n_bins = max(self.counts.shape[1], bins.max() + 1 if len(bins) else 0)
+        if n_bins > self.counts.shape[1]:
+            self.counts = np.pad(self.counts, ((0, 0), (0, n_bins - self.counts.shape[1])))
+
+        self.counts += np.bincount(district_positions * n_bins + bins,
+                                   minlength = self.n_districts * n_bins).reshape(self.n_districts, n_bins)
+        self.sums += np.bincount(district_positions, weights = distances, minlength = self.n_districts)
+
+    def summary(self, quantile = 0.9):
+        """n_cells, mean and the quantile (upper edge of its bin) of each district."""
+        n_cells = self.counts.sum(axis = 1)
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            mean = self.sums / n_cells
+        cumulative = np.cumsum(self.counts, axis = 1)
+        quantile_bins = (cumulative < (quantile * n_cells)[:,np.newaxis]).sum(axis = 1)
+        quantile_distance = np.where(n_cells > 0, (quantile_bins + 1) * self.bin_size, np.nan)
+        return n_cells, mean, quantile_distance
+
+#%% --- The surface ---
+
+def build_accessibility_surface(cell_size = 100,
+                                tile_size = 512,
+                                care_types = None,
+                                raster_dir = project_paths.accessibility_dir,
+                                facility_index = None,
+                                districts = None,
+                                locator = None,
+                                bin_size = 10):
+    """Compute the distance to the nearest facility of each care type over a grid.
+
+    Arguments:
+        cell_size (float): Size of a grid cell, in metres.
+        tile_size (int): Number of cells per side of a tile.
+        care_types (list): The care types. None uses every care type of the
+            facilities.
+        raster_dir (str): Folder of the GeoTIFFs, one per care type
+            (istanbul_distance_to_<care type>.tif). None skips the rasters
+            and only returns the summaries.
+        facility_index (nearest_facility.FacilityIndex): None loads the
+            cleaned health services data.
+        districts (geopandas.GeoDataFrame): The district layer, for the grid
+            extent. None loads the Istanbul districts.
+        locator (district_assignment.DistrictLocator): Locates the cell
+            centres in the districts. None uses the Istanbul districts.
+        bin_size (float): Width of the histogram bins of the summaries, in metres.
+
+    Returns:
+        pandas.DataFrame: One row per district and care type with n_cells,
+            mean_distance_m and p90_distance_m.
+    """
+    facility_index = facility_index or FacilityIndex()
+    districts = districts if districts is not None else load_districts(["district_e"])
+    locator = locator or istanbul_district_locator()
+    if care_types is None:
+        care_types = sorted(facility_index.facilities.loc[:,"care_type"].dropna().unique())
+
+    spec = grid_spec(districts, cell_size)
+    to_lonlat = Transformer.from_crs(spec["crs"], "EPSG:4326", always_xy = True)
+    district_names = locator.names[:-1]
+    histograms = {care_type: DistanceHistogram(len(district_names), bin_size) for care_type in care_types}
+
+    rasters = {}
+    if raster_dir is not None:
+        os.makedirs(raster_dir, exist_ok = True)
+        for care_type in care_types:
+            raster_fp = os.path.join(raster_dir, "istanbul_distance_to_{}.tif".format(care_type_slug(care_type)))
+            rasters[care_type] = open_distance_raster(raster_fp, spec, tile_size)
+
+    try:
+        for row_offset, column_offset, height, width in iter_tiles(spec, tile_size):
+            longitude, latitude = tile_cell_centres(spec, row_offset, column_offset, height, width, to_lonlat)
+            district_positions = locator.locate_positions(longitude, latitude)
+            land = district_positions != -1
+            if not land.any() and not rasters:
+                continue
+
+            for care_type in care_types:
+                tile = np.full(height * width, np.nan, dtype = "float32")
+                if land.any():
+                    distances, _ = facility_index.nearest(longitude[land], latitude[land], care_type = care_type)
+                    tile[land] = distances[:,0]
+                    histograms[care_type].update(district_positions[land], distances[:,0])
+
+                if care_type in rasters:
+                    rasters[care_type].write(tile.reshape(height, width), 1,
+                                             window = Window(column_offset, row_offset, width, height))
+    finally:
+        for raster in rasters.values():
+            raster.close()
+
+    summaries = []
+    for care_type, histogram in histograms.items():
+        n_cells, mean, p90 = histogram.summary(0.9)
+        summaries.append(pd.DataFrame({"district_tr": district_names,
+                                       "care_type": care_type,
+                                       "n_cells": n_cells,
+                                       "mean_distance_m": mean.round(1),
+                                       "p90_distance_m": p90}))
+
+    return pd.concat(summaries, ignore_index = True)
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #accessibility_summary = build_accessibility_surface()
+    #accessibility_summary.to_csv(project_paths.accessibility_summary_fp, encoding = "utf-8-sig", index = False)
+    pass
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 04:12:36 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module holds the metric crs and the regular grid over Istanbul that the
+accessibility measures share: the distance surface (accessibility_surface.py),
+the 2SFCA index (floating_catchment.py), the service areas
+(service_areas.py) and the district rates (district_rates.py).
+
+It needs neither rasterio nor any other raster library; only
+accessibility_surface.py writes rasters.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+
+#%% --- The grid ---
+
+#Metric crs of the grid: UTM zone 35N covers Istanbul
+accessibility_crs = "EPSG:32635"
+
+def grid_spec(districts, cell_size = 100, crs = accessibility_crs):
+    """Lay a grid over the extent of the districts.
+
+    Arguments:
+        districts (geopandas.GeoDataFrame): The district layer.
+        cell_size (float): Size of a cell, in metres.
+        crs (str): Metric crs of the grid.
+
+    Returns:
+        dict: origin_x / origin_y (top left corner), width / height (number
+            of cells), cell_size and crs.
+    """
+    minx, miny, maxx, maxy = districts.to_crs(crs).total_bounds
+    origin_x = np.floor(minx / cell_size) * cell_size
+    origin_y = np.ceil(maxy / cell_size) * cell_size
+
+    return {"origin_x": origin_x,
+            "origin_y": origin_y,
+            "width": int(np.ceil((maxx - origin_x) / cell_size)),
+            "height": int(np.ceil((origin_y - miny) / cell_size)),
+            "cell_size": cell_size,
+            "crs": crs}
+
+
+def iter_tiles(spec, tile_size = 512):
+    """Yield the windows (row_offset, column_offset, height, width) of the grid's tiles."""
+    for row_offset in range(0, spec["height"], tile_size):
+        for column_offset in range(0, spec["width"], tile_size):
+            yield (row_offset, column_offset,
+                   min(tile_size, spec["height"] - row_offset),
+                   min(tile_size, spec["width"] - column_offset))
+
+
+def tile_cell_centres(spec, row_offset, column_offset, height, width, to_lonlat):
+    #Longitude / latitude of the cell centres of a tile, row by row
+    rows, columns = np.mgrid[row_offset:row_offset + height, column_offset:column_offset + width]
+    x = spec["origin_x"] + (columns.ravel() + 0.5) * spec["cell_size"]
+    y = spec["origin_y"] - (rows.ravel() + 0.5) * spec["cell_size"]
+    return to_lonlat.transform(x, y)
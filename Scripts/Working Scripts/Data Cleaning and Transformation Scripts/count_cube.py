@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:12:47 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module counts the institutions once, for every combination of district,
+institution type, ownership and care type, and serves the counts that the
+figures need from that.
+
+The analysis scripts used to count with nested groupby(...).get_group()
+loops, one district and one institution type at a time, and wrote each count
+back into districts_extra through a boolean mask. When a district had none of
+an institution type, get_group failed, the error was passed over and the
+counts of the previous institution type were written in its place.
+
+The cube is a dense integer array with one axis per column:
+
+    district_eng x institution_type_eng x private_or_public x care_type
+
+The labels of each axis are the categories of the column (health_schema.py),
+so every district and every type has its place, with a count of 0 when there
+are none. The whole cube is counted in one np.bincount call over the category
+codes of the rows (a crosstab of the four columns). Rows with a missing value
+in one of the columns are left out.
+
+Slicing it:
+
+    cube = build_count_cube()
+    cube.table("district_eng", "private_or_public", institution_type_eng = "Hospital")
+
+gives a district x (Private, Public) table of the hospitals. Filters take a
+label or a list of labels of an axis; the axes that are not asked for are
+summed over.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+import pandas as pd
+
+from healthservices_columnar_store import load_health
+
+#%% --- The cube ---
+
+#The axes of the cube, in order
+count_cube_axes = ["district_eng", "institution_type_eng", "private_or_public", "care_type"]
+
+class CountCube:
+    """Institution counts over labelled axes."""
+
+    def __init__(self, counts, labels):
+        """
+        Arguments:
+            counts (numpy.ndarray): The integer counts, one dimension per axis.
+            labels (dict): axis name -> pandas.Index of its labels, in the
+                order of the dimensions.
+        """
+        self.counts = counts
+        self.labels = labels
+
+    @property
+    def axes(self):
+        return list(self.labels)
+
+    def select(self, **filters):
+        """The part of the cube that passes the filters.
+
+        Arguments:
+            **filters: axis name = a label or a list of labels.
+
+        Returns:
+            CountCube: The same axes, with only the selected labels.
+        """
+        unknown_axes = set(filters) - set(self.labels)
+        if unknown_axes:
+            raise ValueError("The cube has no axis {}".format(sorted(unknown_axes)))
+
+        counts = self.counts
+        labels = dict(self.labels)
+        for axis, values in filters.items():
+            values = [values] if isinstance(values, str) else list(values)
+            positions = labels[axis].get_indexer(values)
+            if (positions == -1).any():
+                missing = [value for value, position in zip(values, positions) if position == -1]
+                raise ValueError("Unknown {} {}".format(axis, missing))
+
+            counts = np.take(counts, positions, axis = self.axes.index(axis))
+            labels[axis] = labels[axis][positions]
+
+        return CountCube(counts, labels)
+
+    def table(self, rows, columns = None, **filters):
+        """Counts by one or two axes, summed over the others.
+
+        Arguments:
+            rows (str): The axis of the rows.
+            columns (str): The axis of the columns. None gives a Series.
+            **filters: See select.
+
+        Returns:
+            pandas.Series or pandas.DataFrame: The counts.
+        """
+        cube = self.select(**filters)
+        keep = [rows] if columns is None else [rows, columns]
+        other_dimensions = tuple(position for position, axis in enumerate(cube.axes) if axis not in keep)
+        counts = cube.counts.sum(axis = other_dimensions)
+
+        if columns is None:
+            return pd.Series(counts, index = cube.labels[rows], name = "count")
+
+        #sum keeps the dimensions in the cube's order
+        if cube.axes.index(rows) > cube.axes.index(columns):
+            counts = counts.T
+        return pd.DataFrame(counts, index = cube.labels[rows], columns = cube.labels[columns])
+
+    def total(self, **filters):
+        """The number of institutions that pass the filters."""
+        return int(self.select(**filters).counts.sum())
+
+
+def build_count_cube(health = None, axes = count_cube_axes):
+    """Count the institutions over the axes.
+
+    Arguments:
+        health (pandas.DataFrame): Health services data with the axes as
+            categorical columns. None loads the cleaned health services data.
+        axes (list): The columns to count by.
+
+    Returns:
+        CountCube: The counts.
+    """
+    if health is None:
+        health = load_health(columns = axes)
+
+    labels = {axis: pd.Index(health.loc[:,axis].cat.categories, name = axis) for axis in axes}
+    shape = tuple(len(axis_labels) for axis_labels in labels.values())
+
+    #Category codes are -1 for missing values
+    codes = np.column_stack([health.loc[:,axis].cat.codes.to_numpy() for axis in axes])
+    complete = (codes != -1).all(axis = 1)
+    flat = np.ravel_multi_index(tuple(codes[complete].T), shape)
+    counts = np.bincount(flat, minlength = int(np.prod(shape))).reshape(shape).astype("int32")
+
+    return CountCube(counts, labels)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 01:31:02 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module is the one place the analysis scripts get their data from:
+
+    - health(columns): The cleaned health services data.
+    - districts(): The Istanbul district layer.
+    - district_covariates(): district_income.xlsx (population and income).
+    - districts_with_counts(metric): The district layer joined with the
+    covariates and the number of institutions of a metric (all institutions,
+    private ones, low level care...) in each district, plus that number per
+    person (normalized_count).
+
+Each script used to read the sources itself and redo the same joins: the
+value_counts().reset_index() of the districts, the district_eng ->
+district_e renames, the merges with the geodataframe.
+
+Every accessor is memoized: a source is read, and a join is made, once per
+python session. Spyder's runfile keeps the imported modules between runs,
+so regenerating every figure in one console reads each source once. The
+accessors hand out copies, so a script that changes its data in place does
+not change it for the next one.
+
+The results are also kept on disk (Data/cache), as Parquet files named
+after a hash of the source files they were made from. Changing a source
+changes the hash, so a stale file is never read; it is deleted when its
+replacement is written. The code that makes them (this file and
+count_cube.py) is hashed too. The health services data and the district
+layer are read from their own Parquet copies, which are fast enough as they
+are.
+
+district_income.xlsx is ingested once into a typed Parquet table
+(Data/cache/district_income.parquet): reading an xlsx means unzipping and
+parsing XML with openpyxl on every run. The ingest checks the sheet (see
+validate_district_covariates) so that its join keys can be trusted. The
+table keeps the modification time, size and sha256 of the xlsx it was made
+from. When the modification time or size of the xlsx changes, the xlsx is
+hashed; a new hash means a new ingest.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+import glob
+import json
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from healthservices_columnar_store import load_health
+from district_layer import load_districts
+from count_cube import build_count_cube, count_cube_axes
+import count_cube as count_cube_module
+from health_schema import health_vocabularies
+import project_paths
+
+#%% --- Hashes of the sources ---
+
+@lru_cache(maxsize = None)
+def hash_file(fp, modified_ns, size):
+    #The size and the modification time are part of the key, so a changed
+    #file is hashed again, an unchanged one only once
+    digest = hashlib.sha256()
+    with open(fp, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hash(fp):
+    """sha256 of a file's contents."""
+    stat = os.stat(fp)
+    return hash_file(os.path.abspath(fp), stat.st_mtime_ns, stat.st_size)
+
+
+def existing_source(*fps):
+    #The first of the filepaths that exists, the way the loaders fall back
+    for fp in fps:
+        if os.path.exists(fp):
+            return fp
+    raise FileNotFoundError("None of {} exists".format(list(fps)))
+
+
+def health_source():
+    return existing_source(project_paths.health_parquet_fp, project_paths.health_cleaned_fp)
+
+
+def districts_source():
+    return existing_source(project_paths.istanbul_districts_parquet_fp, project_paths.istanbul_districts_fp)
+
+#%% --- The on-disk cache ---
+
+#The code the derived tables are made with. It is hashed along with the data,
+#so a changed metric or join gives a new cache file instead of the old one.
+code_sources = [__file__, count_cube_module.__file__]
+
+def cached_frame(name, sources, build, cache_dir = project_paths.data_cache_dir, geo = False):
+    """Read a dataframe from the cache, or build it and write it there.
+
+    Arguments:
+        name (str): Name of the dataframe, the start of its filename.
+        sources (list): The filepaths it is made from.
+        build (function): Builds it when there is no cached file.
+        cache_dir (str): Folder of the cache.
+        geo (bool): It is a GeoDataFrame.
+
+    Returns:
+        pandas.DataFrame or geopandas.GeoDataFrame: The dataframe.
+    """
+    key = hashlib.sha256("|".join([name] + [source_hash(fp) for fp in sources]).encode("utf-8"))
+    cache_fp = os.path.join(cache_dir, "{}-{}.parquet".format(name, key.hexdigest()[:16]))
+
+    if os.path.exists(cache_fp):
+        return gpd.read_parquet(cache_fp) if geo else pd.read_parquet(cache_fp)
+
+    frame = build()
+    os.makedirs(cache_dir, exist_ok = True)
+    #Write to a temporary file first, so an interrupted write leaves no broken file
+    frame.to_parquet(cache_fp + ".tmp")
+    os.replace(cache_fp + ".tmp", cache_fp)
+    for stale_fp in glob.glob(os.path.join(cache_dir, "{}-*.parquet".format(name))):
+        if stale_fp != cache_fp:
+            os.remove(stale_fp)
+
+    return frame
+
+#%% --- The covariates sheet ---
+
+#The columns of district_income.xlsx and their types
+district_covariate_dtypes = {"district_tr": "str",
+                             "district_eng": "str",
+                             "population": "int64",
+                             "yearly_average_household_income": "float64"}
+
+def validate_district_covariates(covariates):
+    """Check the covariates sheet and give it its types.
+
+    Every district must be there once, with the names of the cleaned data
+    (health_schema.py), a population and a positive income.
+
+    Arguments:
+        covariates (pandas.DataFrame): The sheet, as read from the xlsx.
+
+    Returns:
+        pandas.DataFrame: The typed sheet, keys stripped of spaces.
+
+    Raises:
+        ValueError: Listing every problem that was found.
+    """
+    problems = []
+    missing_columns = [column for column in district_covariate_dtypes if column not in covariates.columns]
+    if missing_columns:
+        raise ValueError("district_income.xlsx has no {} column".format(missing_columns))
+
+    covariates = covariates.loc[:,list(district_covariate_dtypes)].copy()
+    for key in ["district_tr", "district_eng"]:
+        covariates.loc[:,key] = covariates.loc[:,key].astype("str").str.strip()
+        duplicated = covariates.loc[covariates.loc[:,key].duplicated(),key].tolist()
+        unknown = sorted(set(covariates.loc[:,key]) - set(health_vocabularies[key]))
+        absent = sorted(set(health_vocabularies[key]) - set(covariates.loc[:,key]))
+        for problem, names in [("repeated", duplicated), ("unknown", unknown), ("missing", absent)]:
+            if names:
+                problems.append("{} {} names: {}".format(problem, key, names))
+
+    for column in ["population", "yearly_average_household_income"]:
+        values = pd.to_numeric(covariates.loc[:,column], errors = "coerce")
+        if values.isna().any() or (values <= 0).any():
+            problems.append("{} is missing, not a number or not positive for {}".format(
+                column, covariates.loc[values.isna() | (values <= 0),"district_eng"].tolist()))
+        elif column == "population" and (values != np.round(values)).any():
+            problems.append("population is not a whole number for {}".format(
+                covariates.loc[values != np.round(values),"district_eng"].tolist()))
+
+    if problems:
+        raise ValueError("district_income.xlsx: " + "; ".join(problems))
+
+    return covariates.astype(district_covariate_dtypes).reset_index(drop = True)
+
+
+def read_cache_source(cache_fp):
+    #The description of the xlsx that a cached table was made from
+    metadata = pq.read_schema(cache_fp).metadata or {}
+    source = metadata.get(b"district_income_source")
+    return json.loads(source) if source else None
+
+
+def write_covariate_cache(covariates, cache_fp, source):
+    table = pa.Table.from_pandas(covariates, preserve_index = False)
+    table = table.replace_schema_metadata({**table.schema.metadata,
+                                           b"district_income_source": json.dumps(source).encode("utf-8")})
+    os.makedirs(os.path.dirname(cache_fp), exist_ok = True)
+    pq.write_table(table, cache_fp + ".tmp")
+    os.replace(cache_fp + ".tmp", cache_fp)
+
+
+def load_district_covariates(xlsx_fp = project_paths.district_income_fp,
+                             cache_fp = project_paths.district_income_cache_fp):
+    """Read the covariates from the cache, ingesting the xlsx when it has changed.
+
+    Returns:
+        pandas.DataFrame: district_tr, district_eng, population and
+            yearly_average_household_income, one row per district.
+    """
+    stat = os.stat(xlsx_fp)
+    cached_source = read_cache_source(cache_fp) if os.path.exists(cache_fp) else None
+
+    #Same modification time and size: no need to look inside the xlsx
+    if cached_source and (cached_source["mtime_ns"], cached_source["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return pd.read_parquet(cache_fp)
+
+    source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": source_hash(xlsx_fp)}
+    if cached_source and cached_source["sha256"] == source["sha256"]:
+        #Touched but not changed: keep the table, remember the new time
+        covariates = pd.read_parquet(cache_fp)
+    else:
+        covariates = validate_district_covariates(pd.read_excel(xlsx_fp))
+
+    write_covariate_cache(covariates, cache_fp, source)
+    return covariates
+
+#%% --- Memoized sources ---
+
+@lru_cache(maxsize = None)
+def health_table():
+    return load_health()
+
+
+@lru_cache(maxsize = None)
+def district_table():
+    return load_districts()
+
+
+@lru_cache(maxsize = None)
+def covariate_table():
+    return load_district_covariates()
+
+
+@lru_cache(maxsize = None)
+def count_cube():
+    """The count cube of the cleaned data (count_cube.py), shared and memoized."""
+    return build_count_cube(health_table().loc[:,count_cube_axes])
+
+#%% --- Accessors ---
+
+def health(columns = None):
+    """The cleaned health services data.
+
+    Arguments:
+        columns (list): The columns to return. None returns all of them.
+
+    Returns:
+        pandas.DataFrame: A copy of the data.
+    """
+    table = health_table()
+    return (table if columns is None else table.loc[:,list(columns)]).copy()
+
+
+def districts():
+    """The Istanbul district layer (a copy)."""
+    return district_table().copy()
+
+
+def district_covariates():
+    """district_income.xlsx: district_tr, district_eng, population and
+    yearly_average_household_income (a copy)."""
+    return covariate_table().copy()
+
+
+#The institutions each metric counts, as count cube filters
+count_metrics = {"institutions": {},
+                 "private": {"private_or_public": "Private"},
+                 "public": {"private_or_public": "Public"},
+                 "hospital level": {"care_type": "hospital level"},
+                 "low level": {"care_type": "low level"},
+                 "specialized": {"care_type": "specialized"}}
+
+@lru_cache(maxsize = None)
+def district_count_table(metric):
+    if metric not in count_metrics:
+        raise ValueError("Unknown metric {}, the metrics are {}".format(metric, list(count_metrics)))
+
+    def build():
+        counts = (count_cube().table("district_eng", **count_metrics[metric])
+                  .rename_axis("district_e").reset_index())
+        covariates = covariate_table().rename(columns = {"district_eng": "district_e"})
+        merged = (district_table()
+                  .merge(covariates, on = "district_e", how = "left")
+                  .merge(counts, on = "district_e", how = "left"))
+        merged.loc[:,"normalized_count"] = merged.loc[:,"count"] / merged.loc[:,"population"]
+        return merged
+
+    sources = [health_source(), districts_source(), project_paths.district_income_fp] + code_sources
+    return cached_frame("districts_with_{}".format(metric.replace(" ", "_")), sources, build, geo = True)
+
+
+def districts_with_counts(metric = "institutions"):
+    """The district layer with the covariates and an institution count.
+
+    Arguments:
+        metric (str): The institutions to count, a key of count_metrics.
+
+    Returns:
+        geopandas.GeoDataFrame: The district layer (district_e...), the
+            covariates (district_tr, population,
+            yearly_average_household_income), count (0 where there is none)
+            and normalized_count (count per person). A copy.
+    """
+    return district_count_table(metric).copy()
+
+
+def clear_memory():
+    """Forget the memoized data, e.g. after re-running the cleaning pipeline."""
+    for memoized in [hash_file, health_table, district_table, covariate_table, count_cube, district_count_table]:
+        memoized.cache_clear()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:31:44 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module contains the tools that are used to inspect a raw dataset before
+cleaning it. It replaces the random_sample_from_dataset and sample_reader
+functions of the raw data cleaner.
+
+It has three parts:
+    - A reservoir sampler that keeps a uniform random sample (without
+    replacement) of a csv that is read in chunks.
+    - A column profiler that collects nulls, cardinality, the most common
+    values and suspicious glyphs (letters that do not belong in Turkish or
+    English text, e.g. the mojibake ý þ ð) for every column.
+    - A compact text or HTML report of the two.
+
+profile_csv feeds every chunk to both the sampler and the profiler, so a
+whole dump is inspected in a single pass and never held in memory.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import string
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+#%% --- Reservoir sampling ---
+
+class ReservoirSampler:
+    """Keep a uniform random sample of sample_size rows from a stream of chunks.
+
+    Every row that has been seen so far has the same chance of being in the
+    sample, no matter how many chunks there are. The random draws of a chunk
+    are made in one vectorized call.
+    """
+
+    def __init__(self, sample_size, seed = None):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.n_seen = 0
+        self.reservoir = None
+
+    def update(self, chunk):
+        chunk = chunk.reset_index(drop = True)
+
+        #Fill the reservoir with the first rows
+        n_fill = max(min(self.sample_size - self.n_seen, len(chunk)), 0)
+        if n_fill:
+            fill_rows = chunk.iloc[:n_fill]
+            self.reservoir = fill_rows if self.reservoir is None else pd.concat([self.reservoir, fill_rows])
+            self.reservoir = self.reservoir.reset_index(drop = True)
+
+        #Row number t (0-based) replaces a random slot with probability k / (t + 1)
+        positions = np.arange(self.n_seen + n_fill, self.n_seen + len(chunk))
+        if len(positions):
+            slots = self.rng.integers(0, positions + 1)
+            accepted = slots < self.sample_size
+            if accepted.any():
+                #When a slot is drawn twice in a chunk, the later row wins,
+                #the same as replacing the rows one by one
+                replacements = (pd.Series(np.flatnonzero(accepted) + n_fill,
+                                          index = slots[accepted])
+                                .groupby(level = 0).last())
+                new_rows = chunk.iloc[replacements.to_numpy()].set_index(replacements.index)
+                self.reservoir = pd.concat([self.reservoir.drop(replacements.index), new_rows]).sort_index()
+
+        self.n_seen += len(chunk)
+
+    def sample(self):
+        return self.reservoir.reset_index(drop = True) if self.reservoir is not None else pd.DataFrame()
+
+#%% --- Column profiling ---
+
+#Letters that can show up in clean Turkish or English text. Anything else in
+#a text column is reported as a suspicious glyph.
+TURKISH_LETTERS = "çğıöşüÇĞİÖŞÜâîûÂÎÛ"
+EXPECTED_CHARACTERS = set(string.printable + TURKISH_LETTERS)
+
+class ColumnProfiler:
+    """Profile every column of a stream of chunks in one pass.
+
+    Each column keeps one running total of its value counts, which every
+    chunk's counts are added to, so every chunk is scanned exactly once and
+    the memory does not grow with the number of chunks. When a column's
+    dtype differs between chunks, every dtype it had is reported, in order
+    (e.g. "int64 -> float64").
+    """
+
+    def __init__(self, top_n = 5):
+        self.top_n = top_n
+        self.n_rows = 0
+        self.null_counts = Counter()
+        self.dtypes = {}
+        self.value_counts = {}
+
+    def update(self, chunk):
+        self.n_rows += len(chunk)
+        for column in chunk.columns:
+            self.null_counts[column] += int(chunk.loc[:,column].isna().sum())
+            dtypes = self.dtypes.setdefault(column, [])
+            if not dtypes or dtypes[-1] != str(chunk.loc[:,column].dtype):
+                dtypes.append(str(chunk.loc[:,column].dtype))
+
+            chunk_counts = chunk.loc[:,column].value_counts()
+            running = self.value_counts.get(column)
+            self.value_counts[column] = chunk_counts if running is None else running.add(chunk_counts, fill_value = 0)
+
+    def profile(self):
+        """Build the profile table.
+
+        Returns:
+            pandas.DataFrame: One row per column with its dtype, null count,
+                null share, number of distinct values, most common values and
+                suspicious glyphs (with the number of rows they appear in).
+        """
+        rows = []
+        for column, counts in self.value_counts.items():
+            counts = counts.astype("int64").sort_values(ascending = False)
+
+            top_values = ", ".join("{} ({})".format(str(value)[:30], count)
+                                   for value, count in counts.iloc[:self.top_n].items())
+
+            glyph_rows = Counter()
+            if set(self.dtypes[column]) & {"object", "str", "string"}:
+                for value, count in counts.items():
+                    for glyph in set(str(value)) - EXPECTED_CHARACTERS:
+                        glyph_rows[glyph] += count
+            suspicious_glyphs = ", ".join("{} ({})".format(glyph, count)
+                                          for glyph, count in glyph_rows.most_common())
+
+            rows.append({"column": column,
+                         "dtype": " -> ".join(self.dtypes[column]),
+                         "n_null": self.null_counts[column],
+                         "null_share": round(self.null_counts[column] / self.n_rows, 3) if self.n_rows else np.nan,
+                         "n_unique": len(counts),
+                         "top_values": top_values,
+                         "suspicious_glyphs": suspicious_glyphs})
+
+        return pd.DataFrame(rows).set_index("column")
+
+#%% --- Profiling a csv ---
+
+def profile_csv(fp, sample_size = 10, chunksize = 50000, top_n = 5, seed = None, **read_csv_kwargs):
+    """Sample and profile a csv in a single chunked pass.
+
+    Arguments:
+        fp (str): Filepath of the csv.
+        sample_size (int): Number of rows to sample.
+        chunksize (int): Number of rows per chunk.
+        top_n (int): Number of most common values to report per column.
+        seed (int): Seed of the sampler, for a reproducible sample.
+        **read_csv_kwargs: Passed on to pandas.read_csv (e.g. usecols).
+
+    Returns:
+        tuple: (profile table, random sample) as pandas.DataFrames.
+    """
+    sampler = ReservoirSampler(sample_size, seed)
+    profiler = ColumnProfiler(top_n)
+
+    for chunk in pd.read_csv(fp, chunksize = chunksize, **read_csv_kwargs):
+        sampler.update(chunk)
+        profiler.update(chunk)
+
+    return profiler.profile(), sampler.sample()
+
+#%% --- Reports ---
+
+def profile_report(profile, sample = None, html = False):
+    """Format a profile (and optionally a sample) as a compact report.
+
+    Arguments:
+        profile (pandas.DataFrame): As returned by ColumnProfiler.profile.
+        sample (pandas.DataFrame): A sample to print column by column.
+        html (bool): Return an HTML page instead of plain text.
+
+    Returns:
+        str: The report.
+    """
+    if html:
+        report = "<h2>Column profile</h2>\n" + profile.to_html()
+        if sample is not None:
+            report += "\n<h2>Random sample</h2>\n" + sample.T.to_html()
+        return "<html><head><meta charset=\"utf-8\"></head><body>\n" + report + "\n</body></html>"
+
+    with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+        report = "--- Column profile ---\n" + profile.to_string()
+
+        #The sample is transposed: one line per column, one column per row
+        if sample is not None:
+            report += "\n\n--- Random sample ---\n" + sample.T.to_string()
+
+    return report
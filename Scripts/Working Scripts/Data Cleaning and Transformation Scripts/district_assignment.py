@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:26:05 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module finds the district that each institution's coordinates fall in
+and checks it against the district name the data gives.
+
+The district_tr of the raw data is a text label, the latitude / longitude
+columns are never looked at. The two do not always agree: an institution
+near a border can be labelled with the neighbouring district, and a wrong
+coordinate can put it outside Istanbul altogether.
+
+The point-in-polygon test is vectorized with shapely 2 and an STRtree (a
+packed R-tree). A district polygon is big (thousands of vertices) and its
+bounding box covers a lot of its neighbours, so the polygons are first cut
+into small grid cells. The tree then narrows each point down to one or two
+small pieces and the exact test is cheap. Two million points take about a
+second.
+
+The cleaning pipeline runs this as its last stage and writes two columns:
+    - district_from_geometry: The district the coordinates are in, NaN when
+    they are outside the province.
+    - district_check: "Matches", "Other district", "Outside province" or
+    "No coordinates".
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+from district_layer import load_districts
+from name_normalization import istanbul_district_index
+
+#%% --- Locating points ---
+
+def grid_pieces(geometries, cell_size):
+    """Cut polygons into the cells of a regular grid.
+
+    Arguments:
+        geometries (array-like): The polygons.
+        cell_size (float): Size of the grid cells, in the units of the polygons.
+
+    Returns:
+        tuple: (position of the polygon each piece comes from, the pieces)
+    """
+    geometries = np.asarray(geometries)
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+    cell_x, cell_y = np.meshgrid(np.arange(minx, maxx + cell_size, cell_size),
+                                 np.arange(miny, maxy + cell_size, cell_size))
+    cells = shapely.box(cell_x.ravel(), cell_y.ravel(),
+                        cell_x.ravel() + cell_size, cell_y.ravel() + cell_size)
+
+    positions, cell_positions = shapely.STRtree(cells).query(geometries, predicate = "intersects")
+    pieces = shapely.intersection(geometries[positions], cells[cell_positions])
+
+    non_empty = ~shapely.is_empty(pieces)
+    return positions[non_empty], pieces[non_empty]
+
+
+class DistrictLocator:
+    """Find the district polygon that each point falls in."""
+
+    def __init__(self, geometries, names, cell_size = 0.02):
+        """
+        Arguments:
+            geometries (array-like): The district polygons.
+            names (array-like): The name of each district.
+            cell_size (float): Size of the grid cells that the polygons are
+                cut into, in the units of the polygons (degrees).
+        """
+        self.names = np.append(np.asarray(names, dtype = object), np.nan)
+        self.piece_owners, pieces = grid_pieces(geometries, cell_size)
+        self.tree = shapely.STRtree(pieces)
+
+    def locate_positions(self, longitude, latitude):
+        """Find the position (in names) of the district of each point.
+
+        Arguments:
+            longitude (array-like): x coordinates. NaN is allowed.
+            latitude (array-like): y coordinates. NaN is allowed.
+
+        Returns:
+            numpy.ndarray: The district position of each point, -1 for the
+                points that are in no district.
+        """
+        points = shapely.points(np.asarray(longitude, dtype = "float64"),
+                                np.asarray(latitude, dtype = "float64"))
+
+        district_positions = np.full(len(points), -1)
+        point_positions, piece_positions = self.tree.query(points, predicate = "intersects")
+
+        #A point on a border touches two districts, the first one is kept
+        point_positions, first_hits = np.unique(point_positions, return_index = True)
+        district_positions[point_positions] = self.piece_owners[piece_positions[first_hits]]
+
+        return district_positions
+
+    def locate(self, longitude, latitude):
+        """Find the district of each point.
+
+        Returns:
+            numpy.ndarray: The district name of each point, NaN for the points
+                that are in no district.
+        """
+        #-1 picks the NaN at the end of self.names
+        return self.names[self.locate_positions(longitude, latitude)]
+
+
+@lru_cache(maxsize = None)
+def istanbul_district_locator():
+    """The locator of the Istanbul districts. The names are the canonical
+    Turkish names of the district index, the same ones district_tr uses."""
+    districts = load_districts(["district_e"])
+    names = istanbul_district_index().to_tr(districts.loc[:,"district_e"])
+    return DistrictLocator(districts.geometry.to_numpy(), names.to_numpy())
+
+#%% --- The district check ---
+
+#The district_check values are listed in health_schema.py
+def locate_districts(chunk, locator = None):
+    """Add the district_from_geometry and district_check columns to a chunk.
+
+    Arguments:
+        chunk (pandas.DataFrame): Health services data with district_tr,
+            latitude and longitude.
+        locator (DistrictLocator): None uses the Istanbul districts. Other
+            provinces pass their own.
+
+    Returns:
+        pandas.DataFrame: The chunk.
+    """
+    locator = locator or istanbul_district_locator()
+    district_from_geometry = locator.locate(chunk.loc[:,"longitude"], chunk.loc[:,"latitude"])
+    chunk.loc[:,"district_from_geometry"] = district_from_geometry
+
+    no_coordinates = (chunk.loc[:,"latitude"].isna() | chunk.loc[:,"longitude"].isna()).to_numpy()
+    outside = chunk.loc[:,"district_from_geometry"].isna().to_numpy()
+    matches = (chunk.loc[:,"district_from_geometry"].astype(object) == chunk.loc[:,"district_tr"].astype(object)).to_numpy()
+
+    chunk.loc[:,"district_check"] = np.select([no_coordinates, outside, matches],
+                                              ["No coordinates", "Outside province", "Matches"],
+                                              "Other district")
+    return chunk
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:48:30 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module correlates the number of institutions of every type in a
+district with every district covariate of district_income.xlsx (population,
+yearly average household income) in one go, and writes the results to a tidy
+table that the figures look the r values up in.
+
+The figure scripts used to call st.pearsonr once per figure and axis, for a
+handful of hand-picked types. With 39 districts a single r says little on its
+own, so every r here also gets:
+    - A bootstrap confidence interval: the districts are resampled with
+    replacement and the correlation is recomputed (percentile interval).
+    - A permutation p-value: the counts are shuffled between the districts
+    and the share of shuffles with an r at least as far from 0 as the real
+    one is counted (two-sided).
+
+Both are done as matrix operations. The counts of all types (and
+ownerships) are the columns of one matrix, the covariates the columns of
+another, and all their correlations come out of one matrix product of the
+standardized columns. A batch of resamples is one more dimension of the
+same product. Spearman is Pearson on the ranks. The batches are spread over
+threads (numpy releases the GIL in the product), and every batch has its own
+random seed, so the results do not depend on the number of workers.
+
+A type with the same count in every district (e.g. none at all) has no
+correlation; it gets NaN.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from count_cube import build_count_cube
+from data_access import district_covariates
+import project_paths
+
+#%% --- Correlation matrices ---
+
+def standardized_columns(a):
+    #Centre each column and scale it to a length of 1 (rows are axis -2)
+    centred = a - a.mean(axis = -2, keepdims = True)
+    norms = np.sqrt((centred ** 2).sum(axis = -2, keepdims = True))
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return centred / norms
+
+
+def pearson_matrix(x, y):
+    """Pearson's r of every column of x with every column of y.
+
+    Arguments:
+        x (numpy.ndarray): (..., n, p) array.
+        y (numpy.ndarray): (..., n, q) array. Leading dimensions (batches of
+            resamples) are broadcast.
+
+    Returns:
+        numpy.ndarray: (..., p, q) array of r values.
+    """
+    return np.einsum("...np,...nq->...pq", standardized_columns(x), standardized_columns(y))
+
+
+def spearman_matrix(x, y):
+    """Spearman's rho of every column of x with every column of y, see pearson_matrix."""
+    return pearson_matrix(rankdata(x, axis = -2), rankdata(y, axis = -2))
+
+
+correlation_methods = {"pearson": pearson_matrix, "spearman": spearman_matrix}
+
+#%% --- Resampling ---
+
+def run_batches(function, n, seed, batch_size, workers):
+    #Run function(rng, size) over batches of n draws on a thread pool and
+    #stack the results. Each batch gets its own seed.
+    sizes = [min(batch_size, n - start) for start in range(0, n, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    with ThreadPoolExecutor(max_workers = workers or os.cpu_count()) as executor:
+        results = executor.map(lambda args: function(np.random.default_rng(args[0]), args[1]), zip(seeds, sizes))
+        return np.concatenate(list(results))
+
+
+def bootstrap_intervals(x, y, method = "pearson", n_resamples = 2000, confidence = 0.95,
+                        seed = 0, batch_size = 250, workers = None):
+    """Percentile bootstrap confidence intervals of the correlation matrix.
+
+    Returns:
+        tuple: (lower, upper) bounds, each a (p, q) array.
+    """
+    correlate = correlation_methods[method]
+    n = len(x)
+
+    def resample(rng, size):
+        rows = rng.integers(0, n, size = (size, n))
+        return correlate(x[rows], y[rows])
+
+    resampled = run_batches(resample, n_resamples, seed, batch_size, workers)
+    tail = (1 - confidence) / 2 * 100
+    #A resample can pick one district over and over, which leaves nothing to correlate
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return tuple(np.nanpercentile(resampled, [tail, 100 - tail], axis = 0))
+
+
+def permutation_pvalues(x, y, method = "pearson", n_permutations = 2000,
+                        seed = 0, batch_size = 250, workers = None):
+    """Two-sided permutation p-values of the correlation matrix.
+
+    Returns:
+        numpy.ndarray: (p, q) array of p-values.
+    """
+    correlate = correlation_methods[method]
+    observed = np.abs(correlate(x, y))
+    n = len(x)
+
+    def permute(rng, size):
+        rows = rng.permuted(np.tile(np.arange(n), (size, 1)), axis = 1)
+        #Count the shuffles at least as extreme (with some room for rounding)
+        return (np.abs(correlate(x, y[rows])) >= observed - 1e-12).sum(axis = 0, keepdims = True)
+
+    exceed = run_batches(permute, n_permutations, seed, batch_size, workers).sum(axis = 0)
+    with np.errstate(invalid = "ignore"):
+        return np.where(np.isnan(observed), np.nan, (exceed + 1) / (n_permutations + 1))
+
+#%% --- The correlation stage ---
+
+def read_district_covariates():
+    """The numeric columns of district_income.xlsx, indexed by district_eng."""
+    return district_covariates().set_index("district_eng").select_dtypes("number")
+
+
+def district_correlations(cube = None,
+                          covariates = None,
+                          group_axis = "institution_type_eng",
+                          ownerships = ("All", "Private", "Public"),
+                          methods = ("pearson", "spearman"),
+                          n_resamples = 2000,
+                          n_permutations = 2000,
+                          confidence = 0.95,
+                          seed = 0,
+                          workers = None):
+    """Correlate the institution counts of every group with every district covariate.
+
+    Arguments:
+        cube (count_cube.CountCube): The counts. None counts the cleaned
+            health services data.
+        covariates (pandas.DataFrame): Numeric district covariates, indexed by
+            district_eng. None reads district_income.xlsx.
+        group_axis (str): The cube axis to count by, e.g. institution_type_eng
+            or care_type.
+        ownerships (tuple): "All" and / or the private_or_public values.
+        methods (tuple): "pearson" and / or "spearman".
+        n_resamples (int): Number of bootstrap resamples.
+        n_permutations (int): Number of permutations.
+        confidence (float): Level of the confidence intervals.
+        seed (int): Seed of the resamples and the permutations.
+        workers (int): Number of threads. None uses every core.
+
+    Returns:
+        pandas.DataFrame: One row per group, ownership, covariate and method
+            with n_districts, r, ci_low, ci_high and p_value.
+    """
+    cube = cube or build_count_cube()
+    covariates = covariates if covariates is not None else read_district_covariates()
+
+    #The count columns: every group, once per ownership
+    counts = []
+    for ownership in ownerships:
+        filters = {} if ownership == "All" else {"private_or_public": ownership}
+        table = cube.table("district_eng", group_axis, **filters).reindex(covariates.index, fill_value = 0)
+        table.columns = pd.MultiIndex.from_product([table.columns.astype(str), [ownership]],
+                                                   names = [group_axis, "ownership"])
+        counts.append(table)
+    counts = pd.concat(counts, axis = 1)
+
+    x = covariates.to_numpy(dtype = "float64")
+    y = counts.to_numpy(dtype = "float64")
+
+    results = []
+    for method in methods:
+        with np.errstate(invalid = "ignore"):
+            r = correlation_methods[method](x, y)
+        ci_low, ci_high = bootstrap_intervals(x, y, method, n_resamples, confidence, seed, workers = workers)
+        p_value = permutation_pvalues(x, y, method, n_permutations, seed, workers = workers)
+
+        #(covariate, count column) matrices into long format
+        index = pd.MultiIndex.from_product([covariates.columns, counts.columns],
+                                           names = ["covariate", "counts"])
+        results.append(pd.DataFrame({"method": method,
+                                     "r": r.ravel(),
+                                     "ci_low": ci_low.ravel(),
+                                     "ci_high": ci_high.ravel(),
+                                     "p_value": p_value.ravel()},
+                                    index = index))
+
+    results = pd.concat(results).reset_index()
+    results[[group_axis, "ownership"]] = pd.DataFrame(results.pop("counts").tolist(), index = results.index)
+    results.loc[:,"n_districts"] = len(covariates)
+
+    return results.loc[:,[group_axis, "ownership", "covariate", "method", "n_districts",
+                          "r", "ci_low", "ci_high", "p_value"]]
+
+
+def lookup_correlation(correlations, group, covariate, ownership = "All", method = "pearson",
+                       group_axis = "institution_type_eng", value = "r"):
+    """Look one value (r, ci_low, ci_high or p_value) up in the results table."""
+    match = ((correlations.loc[:,group_axis] == group)
+             & (correlations.loc[:,"covariate"] == covariate)
+             & (correlations.loc[:,"ownership"] == ownership)
+             & (correlations.loc[:,"method"] == method))
+    if match.sum() != 1:
+        raise ValueError("No single result for {} / {} / {} / {}".format(group, covariate, ownership, method))
+    return correlations.loc[match,value].iloc[0]
+
+
+def write_district_correlations(institution_type_fp = project_paths.district_correlations_fp,
+                                care_type_fp = project_paths.care_type_correlations_fp,
+                                **kwargs):
+    """Write the results by institution type and by care type to the csvs the figures read.
+
+    Arguments:
+        institution_type_fp, care_type_fp (str): Filepaths of the results.
+        **kwargs: Passed on to district_correlations.
+    """
+    for group_axis, output_fp in [("institution_type_eng", institution_type_fp), ("care_type", care_type_fp)]:
+        correlations = district_correlations(group_axis = group_axis, **kwargs)
+        correlations.to_csv(output_fp, encoding = "utf-8-sig", index = False)
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #write_district_correlations()
+    pass
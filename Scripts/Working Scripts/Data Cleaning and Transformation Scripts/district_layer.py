@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:11 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module reads the district borders and keeps a GeoParquet cache of the
+Istanbul district layer.
+
+The national tur_polbnda_adm2.shp used to be read whole, only to keep the
+Istanbul rows. read_province_districts passes the province filter (and
+optionally a bounding box) down to the file reader, so only the features of
+the province are decoded.
+
+Every analysis script used to parse istanbul_districts.shp and its dbf again
+on startup. The GeoParquet copy stores the geometries as WKB together with
+their bounding boxes (the "bbox" covering column), so load_districts can read
+only the columns it needs and skip the districts outside of a bounding box
+without decoding their geometries.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+
+import geopandas as gpd
+
+import project_paths
+
+#%% --- Reading the national borders ---
+
+def read_province_districts(adm2_fp = project_paths.adm2_fp, province_tr = "İSTANBUL", bbox = None):
+    """Read the districts of a province from the adm2 borders.
+
+    The filter is run by the file reader, the other provinces are never
+    turned into geometries.
+
+    Arguments:
+        adm2_fp (str): Filepath of tur_polbnda_adm2.
+        province_tr (str or list): adm1_tr of the province, e.g. "İSTANBUL",
+            or a list of them. None reads every province.
+        bbox (tuple): Optional (minx, miny, maxx, maxy) in the crs of the
+            file. Only the features that intersect it are read.
+
+    Returns:
+        geopandas.GeoDataFrame: The adm2 rows of the province.
+    """
+    where = None
+    if province_tr is not None:
+        provinces = [province_tr] if isinstance(province_tr, str) else province_tr
+        where = "adm1_tr IN ({})".format(", ".join("'{}'".format(province.replace("'", "''"))
+                                                  for province in provinces))
+
+    return gpd.read_file(adm2_fp, where = where, bbox = bbox)
+
+#%% --- The GeoParquet cache ---
+
+def write_district_cache(districts, parquet_fp = project_paths.istanbul_districts_parquet_fp):
+    """Write a district layer to its GeoParquet cache.
+
+    Arguments:
+        districts (geopandas.GeoDataFrame): The district layer.
+        parquet_fp (str): Filepath of the cache.
+    """
+    #write_covering_bbox adds the per-row bounding boxes that bbox reads filter on
+    districts.to_parquet(parquet_fp,
+                         index = False,
+                         geometry_encoding = "WKB",
+                         write_covering_bbox = True)
+
+
+def load_districts(columns = None,
+                   bbox = None,
+                   parquet_fp = project_paths.istanbul_districts_parquet_fp,
+                   shapefile_fp = project_paths.istanbul_districts_fp):
+    """Load the Istanbul district layer.
+
+    Arguments:
+        columns (list): The attribute columns to read. None reads all of them.
+            The geometry is always read.
+        bbox (tuple): Optional (minx, miny, maxx, maxy) in EPSG:4326. Only the
+            districts that intersect it are read.
+        parquet_fp (str): Filepath of the GeoParquet cache.
+        shapefile_fp (str): Filepath of the shapefile. It is only used when
+            the cache has not been built yet.
+
+    Returns:
+        geopandas.GeoDataFrame: The district layer, with the columns of the
+            shapefile (district_t, district_e, continent...).
+    """
+    if os.path.exists(parquet_fp):
+        if columns is not None:
+            columns = list(columns) + ["geometry"]
+        return gpd.read_parquet(parquet_fp, columns = columns, bbox = bbox)
+
+    districts = gpd.read_file(shapefile_fp, bbox = bbox)
+    if columns is not None:
+        districts = districts.loc[:,list(columns) + ["geometry"]]
+    return districts
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #write_district_cache(gpd.read_file(project_paths.istanbul_districts_fp))
+    pass
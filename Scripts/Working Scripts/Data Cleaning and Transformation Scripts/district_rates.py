@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 02:20:14 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module turns the institution counts of every district into rates, for
+every metric at once, and puts them on the district layer as columns that a
+choropleth can plot as they are.
+
+The metrics are every institution type, every care type, both ownerships
+and all institutions together. Each metric gets three columns:
+    - <metric>_per_100k: Institutions per 100,000 people of the district.
+    - <metric>_per_km2: Institutions per km² of the district, with the area
+    measured in UTM zone 35N (the metric crs of analysis_grid.py).
+    - <metric>_bracket_per_100k: Institutions per 100,000 people of the
+    district's household income bracket, all districts of the bracket
+    pooled. The brackets are quantiles of
+    yearly_average_household_income (quartiles by default), in the
+    income_bracket column.
+
+The metric names are the labels in snake case: hospital, doctors_office,
+care_low_level, private, institutions...
+
+All the counts come from the count cube (count_cube.py) as one district x
+metric matrix, and every rate is one broadcast division of that matrix.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from data_access import (count_cube, districts, district_covariates, cached_frame,
+                         health_source, districts_source, code_sources)
+from analysis_grid import accessibility_crs
+import project_paths
+
+#%% --- The metrics ---
+
+def metric_name(label, prefix = ""):
+    #"Doctor's Office" -> "doctors_office", "low level" -> "care_low_level"
+    return prefix + re.sub("[^0-9a-z]+", "_", str(label).lower().replace("'", "")).strip("_")
+
+
+def metric_counts(cube, district_index):
+    """The district x metric count matrix.
+
+    Arguments:
+        cube (count_cube.CountCube): The counts.
+        district_index (array-like): The districts (district_eng), in order.
+
+    Returns:
+        pandas.DataFrame: One column per metric.
+    """
+    tables = [cube.table("district_eng").rename("institutions").to_frame()]
+    for axis, prefix in [("institution_type_eng", ""), ("care_type", "care_"), ("private_or_public", "")]:
+        table = cube.table("district_eng", axis)
+        table.columns = [metric_name(label, prefix) for label in table.columns]
+        tables.append(table)
+
+    counts = pd.concat(tables, axis = 1)
+    return counts.reindex(pd.Index(district_index, name = "district_eng"), fill_value = 0)
+
+#%% --- The rates ---
+
+def income_brackets(income, n_brackets = 4):
+    #Quantile brackets, Q1 the poorest
+    return pd.qcut(income, n_brackets, labels = ["Q{}".format(i + 1) for i in range(n_brackets)])
+
+
+def district_rates(cube = None, district_layer = None, covariates = None, n_brackets = 4, crs = accessibility_crs):
+    """Put the per capita, per area and per income bracket rates of every metric on the district layer.
+
+    Arguments:
+        cube (count_cube.CountCube): The counts. None uses the cleaned data.
+        district_layer (geopandas.GeoDataFrame): The districts, with
+            district_e. None loads the Istanbul districts.
+        covariates (pandas.DataFrame): district_eng, population and
+            yearly_average_household_income. None reads district_income.xlsx.
+        n_brackets (int): Number of income brackets.
+        crs (str): Metric crs the areas are measured in.
+
+    Returns:
+        geopandas.GeoDataFrame: The district layer with the covariates,
+            area_km2, income_bracket and three rate columns per metric.
+    """
+    cube = cube or count_cube()
+    district_layer = district_layer if district_layer is not None else districts()
+    covariates = covariates if covariates is not None else district_covariates()
+
+    layer = district_layer.merge(covariates.rename(columns = {"district_eng": "district_e"}),
+                                 on = "district_e", how = "left")
+    layer.loc[:,"area_km2"] = layer.to_crs(crs).area.to_numpy() / 1e6
+    layer.loc[:,"income_bracket"] = income_brackets(layer.loc[:,"yearly_average_household_income"], n_brackets)
+
+    counts = metric_counts(cube, layer.loc[:,"district_e"])
+    count_matrix = counts.to_numpy(dtype = "float64")
+    population = layer.loc[:,"population"].to_numpy(dtype = "float64")
+    area = layer.loc[:,"area_km2"].to_numpy()
+
+    #Pool the counts and the population of each bracket, then hand every
+    #district its bracket's rate
+    bracket_codes = layer.loc[:,"income_bracket"].cat.codes.to_numpy()
+    bracket_counts = np.zeros((n_brackets, count_matrix.shape[1]))
+    np.add.at(bracket_counts, bracket_codes, count_matrix)
+    bracket_population = np.bincount(bracket_codes, weights = population, minlength = n_brackets)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        rates = {"per_100k": count_matrix / population[:,np.newaxis] * 1e5,
+                 "per_km2": count_matrix / area[:,np.newaxis],
+                 "bracket_per_100k": (bracket_counts / bracket_population[:,np.newaxis] * 1e5)[bracket_codes]}
+
+    rate_columns = pd.concat([pd.DataFrame(values,
+                                           columns = ["{}_{}".format(metric, rate) for metric in counts.columns],
+                                           index = layer.index)
+                              for rate, values in rates.items()], axis = 1)
+    #Keep each metric's three columns together
+    rate_columns = rate_columns.loc[:,["{}_{}".format(metric, rate) for metric in counts.columns for rate in rates]]
+
+    return pd.concat([layer, rate_columns], axis = 1)
+
+
+@lru_cache(maxsize = None)
+def district_rate_table():
+    #This file is a source too: changing a rate gives a new cache file
+    sources = [health_source(), districts_source(), project_paths.district_income_fp, __file__] + code_sources
+    return cached_frame("districts_with_rates", sources, district_rates, geo = True)
+
+
+def districts_with_rates():
+    """district_rates of the cleaned data, memoized and cached like data_access.py (a copy)."""
+    return district_rate_table().copy()
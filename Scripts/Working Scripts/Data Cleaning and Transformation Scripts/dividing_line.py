@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:03:52 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module splits districts and institutions into the two sides of a
+dividing line. For Istanbul the line is the Bosphorus and the sides are the
+continents: "eur" (Europe) and "anat" (Anatolia).
+
+The continent of a district used to come from two hand-written lists of
+district names. The lists said "Eyup" where the district layer says
+"Eyupsultan" and did not list Sultangazi at all, so both ended up without a
+continent. Here the side is worked out from the geometry instead:
+    - A point is on the east side if it is inside the polygon that the line
+    closes off with the eastern edge of the map. shapely.contains_xy tests
+    all points in one vectorized call.
+    - A polygon is on the side that holds most of its area.
+
+bosphorus_line follows the middle of the strait (halfway between the
+European and the Anatolian shores of the district layer, every 0.01 degrees
+of latitude) and is extended north into the Black Sea and south into the Sea
+of Marmara, past the edges of the province. The Princes' Islands (Adalar)
+are east of its southern part.
+
+Any other dividing line can be used the same way, as long as it runs from
+north to south and crosses the whole area.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+import shapely
+from shapely.geometry import LineString, Polygon
+
+#%% --- The Bosphorus ---
+
+#(longitude, latitude), from the Black Sea to the Sea of Marmara
+bosphorus_line = LineString([(29.134, 41.70), (29.134, 41.22), (29.122, 41.21),
+                             (29.105, 41.20), (29.101, 41.19), (29.083, 41.18),
+                             (29.073, 41.17), (29.059, 41.16), (29.060, 41.15),
+                             (29.068, 41.14), (29.079, 41.13), (29.083, 41.12),
+                             (29.071, 41.11), (29.060, 41.10), (29.062, 41.09),
+                             (29.058, 41.08), (29.051, 41.07), (29.045, 41.06),
+                             (29.043, 41.05), (29.020, 41.04), (29.003, 41.03),
+                             (28.987, 41.02), (28.998, 41.01), (28.985, 41.00),
+                             (28.980, 40.95), (28.960, 40.60)])
+
+#West side first, east side second
+continents = ("eur", "anat")
+
+#%% --- Sides of a line ---
+
+def east_side_polygon(line = bosphorus_line, east_x = 180.0):
+    """Close a north-to-south line off with the eastern edge of the map.
+
+    Arguments:
+        line (shapely.geometry.LineString): The dividing line, from north to south.
+        east_x (float): Longitude of the eastern edge.
+
+    Returns:
+        shapely.geometry.Polygon: Everything east of the line, between its
+            northern and southern ends.
+    """
+    coordinates = list(line.coords)
+    (_, north_y), (_, south_y) = coordinates[0], coordinates[-1]
+    return Polygon(coordinates + [(east_x, south_y), (east_x, north_y)])
+
+
+def side_of_points(longitude, latitude, line = bosphorus_line, sides = continents):
+    """Find the side of the line that each point is on.
+
+    Arguments:
+        longitude (array-like): x coordinates. NaN is allowed.
+        latitude (array-like): y coordinates. NaN is allowed.
+        line (shapely.geometry.LineString): The dividing line, from north to south.
+        sides (tuple): Labels of the west and the east side.
+
+    Returns:
+        numpy.ndarray: The side of each point, NaN where a coordinate is missing.
+    """
+    longitude = np.asarray(longitude, dtype = "float64")
+    latitude = np.asarray(latitude, dtype = "float64")
+
+    east = shapely.contains_xy(east_side_polygon(line), longitude, latitude)
+    labels = np.where(east, sides[1], sides[0]).astype(object)
+    labels[np.isnan(longitude) | np.isnan(latitude)] = np.nan
+    return labels
+
+
+def side_of_polygons(geometries, line = bosphorus_line, sides = continents):
+    """Find the side of the line that holds most of each polygon's area.
+
+    Arguments:
+        geometries (array-like): The polygons, e.g. the district layer's geometry.
+        line (shapely.geometry.LineString): The dividing line, from north to south.
+        sides (tuple): Labels of the west and the east side.
+
+    Returns:
+        numpy.ndarray: The side of each polygon.
+    """
+    geometries = np.asarray(geometries)
+    east_share = (shapely.area(shapely.intersection(geometries, east_side_polygon(line)))
+                  / shapely.area(geometries))
+    return np.where(east_share > 0.5, sides[1], sides[0]).astype(object)
+
+#%% --- Pipeline stage ---
+
+def tag_continent(chunk):
+    #The side of the Bosphorus each institution is on, from its coordinates
+    chunk.loc[:,"continent"] = side_of_points(chunk.loc[:,"longitude"], chunk.loc[:,"latitude"])
+    return chunk
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:51:36 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module computes the two-step floating catchment area (2SFCA)
+accessibility index of the health facilities.
+
+Dividing a district's facility count by its population (normalized_count of
+the low level care script) assumes that people only use the facilities of
+their own district. 2SFCA lets every facility serve everyone within its
+catchment, across district borders:
+
+    1. Every facility j gets a supply to demand ratio: its supply S_j (1, its
+    number of beds or a weight per type) over the population that lives
+    within its catchment, each person weighted by the distance decay W:
+        R_j = S_j / sum_i(P_i * W_ij)
+    2. Every demand point i (a district, a neighborhood or a grid cell) adds
+    up the ratios of the facilities that it can reach, with the same decay:
+        A_i = sum_j(R_j * W_ij)
+
+A_i is supply per person, e.g. 0.0005 facilities per person (5 per 10,000
+people). It is a population-weighted share of the supply, so the population
+times A adds up to the total supply that is within anyone's reach.
+
+W is 1 at distance 0 and falls to 0 at the catchment radius (Gaussian decay,
+or a step function for the classic 2SFCA). Only the pairs within the radius
+are ever computed: the demand and the facility points go into KD-trees (3D
+unit sphere coordinates, see nearest_facility.py) and their
+sparse_distance_matrix gives the pairs within the radius. W is held as a
+sparse matrix, so tens of thousands of demand points do not need a dense
+demand x facility matrix.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from pyproj import Transformer
+
+from geodistance import unit_sphere_xyz, chord_to_metres, metres_to_chord
+from district_layer import load_districts
+from district_assignment import istanbul_district_locator
+from analysis_grid import grid_spec, iter_tiles, tile_cell_centres
+
+#%% --- Distance decay ---
+
+def catchment_weights(distances_m, catchment_m, decay = "gaussian"):
+    """Distance decay weights, 1 at distance 0 and 0 from the catchment radius on.
+
+    Arguments:
+        distances_m (numpy.ndarray): Distances, in metres.
+        catchment_m (float): Catchment radius, in metres.
+        decay (str): "gaussian" or "step" (no decay within the catchment).
+
+    Returns:
+        numpy.ndarray: The weights.
+    """
+    within = distances_m <= catchment_m
+    if decay == "step":
+        return within.astype("float64")
+
+    #Gaussian decay, shifted so that it reaches 0 at the catchment radius
+    edge = np.exp(-0.5)
+    weights = (np.exp(-0.5 * (distances_m / catchment_m) ** 2) - edge) / (1 - edge)
+    return np.where(within, weights, 0.0)
+
+
+def sparse_catchment_matrix(demand_longitude, demand_latitude,
+                            supply_longitude, supply_latitude,
+                            catchment_m, decay = "gaussian"):
+    """The decay weights of every demand point / facility pair within the catchment.
+
+    Returns:
+        scipy.sparse.csr_matrix: A (n demand, n supply) matrix of weights.
+    """
+    demand_tree = cKDTree(unit_sphere_xyz(demand_longitude, demand_latitude))
+    supply_tree = cKDTree(unit_sphere_xyz(supply_longitude, supply_latitude))
+
+    #"ndarray" output keeps the pairs at distance 0 (a sparse matrix would drop them)
+    pairs = demand_tree.sparse_distance_matrix(supply_tree, metres_to_chord(catchment_m),
+                                               output_type = "ndarray")
+    weights = catchment_weights(chord_to_metres(pairs["v"]), catchment_m, decay)
+
+    return sparse.csr_matrix((weights, (pairs["i"], pairs["j"])),
+                             shape = (demand_tree.n, supply_tree.n))
+
+#%% --- 2SFCA ---
+
+def two_step_fca(demand_longitude, demand_latitude, population,
+                 supply_longitude, supply_latitude, supply,
+                 catchment_m = 3000, decay = "gaussian"):
+    """The 2SFCA accessibility of every demand point.
+
+    Arguments:
+        demand_longitude, demand_latitude (array-like): The demand points.
+        population (array-like): Population of each demand point.
+        supply_longitude, supply_latitude (array-like): The facilities.
+        supply (array-like): Supply of each facility (1, beds...).
+        catchment_m (float): Catchment radius, in metres.
+        decay (str): "gaussian" or "step".
+
+    Returns:
+        tuple: (accessibility of each demand point, supply to demand ratio of
+            each facility). Facilities with nobody in their catchment get a
+            ratio of 0.
+    """
+    weights = sparse_catchment_matrix(demand_longitude, demand_latitude,
+                                      supply_longitude, supply_latitude,
+                                      catchment_m, decay)
+
+    #Step 1: weighted population within each facility's catchment
+    catchment_population = weights.T @ np.asarray(population, dtype = "float64")
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        ratios = np.where(catchment_population > 0,
+                          np.asarray(supply, dtype = "float64") / catchment_population, 0.0)
+
+    #Step 2: the ratios each demand point can reach
+    return weights @ ratios, ratios
+
+
+def facility_supply(facilities, weight = None, missing_weight = 1.0):
+    """The supply of each facility.
+
+    Arguments:
+        facilities (pandas.DataFrame): Health services data.
+        weight: None counts every facility as 1. A column name (e.g. "n#_beds")
+            uses that column. A dict of institution_type_eng -> weight weights
+            the facilities by their type.
+        missing_weight (float): Supply of the facilities with a missing value
+            (or a type that is not in the dict).
+
+    Returns:
+        numpy.ndarray: The supply of each facility.
+    """
+    if weight is None:
+        return np.ones(len(facilities))
+    if isinstance(weight, dict):
+        supply = facilities.loc[:,"institution_type_eng"].astype(object).map(weight)
+    else:
+        supply = facilities.loc[:,weight]
+    return supply.astype("float64").fillna(missing_weight).to_numpy()
+
+#%% --- Demand points ---
+
+def grid_population(district_population, cell_size = 500, districts = None, locator = None):
+    """Spread the population of each district evenly over its land grid cells.
+
+    Arguments:
+        district_population (pandas.Series): Population, indexed by the
+            canonical Turkish district name (district_tr).
+        cell_size (float): Size of a grid cell, in metres.
+        districts (geopandas.GeoDataFrame): The district layer, for the grid
+            extent. None loads the Istanbul districts.
+        locator (district_assignment.DistrictLocator): None uses the Istanbul
+            districts.
+
+    Returns:
+        pandas.DataFrame: One row per land cell with longitude, latitude,
+            district_tr and population.
+    """
+    districts = districts if districts is not None else load_districts(["district_e"])
+    locator = locator or istanbul_district_locator()
+    spec = grid_spec(districts, cell_size)
+    to_lonlat = Transformer.from_crs(spec["crs"], "EPSG:4326", always_xy = True)
+
+    cells = []
+    for row_offset, column_offset, height, width in iter_tiles(spec):
+        longitude, latitude = tile_cell_centres(spec, row_offset, column_offset, height, width, to_lonlat)
+        district_tr = locator.locate(longitude, latitude)
+        land = pd.notna(district_tr)
+        cells.append(pd.DataFrame({"longitude": longitude[land],
+                                   "latitude": latitude[land],
+                                   "district_tr": district_tr[land]}))
+
+    cells = pd.concat(cells, ignore_index = True)
+    cells_per_district = cells.loc[:,"district_tr"].map(cells.loc[:,"district_tr"].value_counts())
+    cells.loc[:,"population"] = cells.loc[:,"district_tr"].map(district_population) / cells_per_district
+    return cells
+
+
+def district_accessibility(facilities, district_population, catchment_m = 3000, decay = "gaussian",
+                           weight = None, cell_size = 500, per = 10000):
+    """2SFCA accessibility of each district, from grid cell demand points.
+
+    The accessibility of the cells is averaged over each district, weighted
+    by their population.
+
+    Arguments:
+        facilities (pandas.DataFrame): The facilities to measure the access to,
+            with latitude and longitude (e.g. the low level care institutions).
+        district_population (pandas.Series): Population, indexed by district_tr.
+        catchment_m (float): Catchment radius, in metres.
+        decay (str): "gaussian" or "step".
+        weight: See facility_supply.
+        cell_size (float): Size of the grid cells, in metres.
+        per (float): Scale of the result, e.g. facilities per 10,000 people.
+
+    Returns:
+        pandas.Series: Accessibility per district, indexed by district_tr.
+    """
+    has_coordinates = facilities.loc[:,"latitude"].notna() & facilities.loc[:,"longitude"].notna()
+    facilities = facilities.loc[has_coordinates,:]
+    cells = grid_population(district_population, cell_size)
+
+    accessibility, _ = two_step_fca(cells.loc[:,"longitude"], cells.loc[:,"latitude"],
+                                    cells.loc[:,"population"].fillna(0),
+                                    facilities.loc[:,"longitude"], facilities.loc[:,"latitude"],
+                                    facility_supply(facilities, weight),
+                                    catchment_m, decay)
+
+    cells.loc[:,"weighted_accessibility"] = accessibility * cells.loc[:,"population"]
+    by_district = cells.groupby("district_tr").agg(weighted_accessibility = ("weighted_accessibility", "sum"),
+                                                   population = ("population", "sum"))
+    return (by_district.loc[:,"weighted_accessibility"] / by_district.loc[:,"population"] * per).rename("accessibility")
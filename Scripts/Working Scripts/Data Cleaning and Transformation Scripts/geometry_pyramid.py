@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:41:27 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module precomputes simplified versions (levels of detail) of the
+district polygons and picks the right one when a map is plotted.
+
+The full resolution Istanbul layer has ~78k vertices. On a 19.2 inch figure
+saved at 300 dpi a pixel is ~0.0003 degrees wide, so most of those vertices
+land on the same pixel; they only make the plotting and the SVG exports slow
+and large.
+
+The districts are simplified as a coverage (shapely.coverage_simplify): a
+border that two districts share is simplified once and used by both, so no
+gaps or overlaps show up between neighbours. Each level has a tolerance in
+degrees:
+
+    level 0: full resolution
+    level 1: 0.0001 (~10 m, ~20k vertices)
+    ...
+    level 6: 0.005 (~500 m, ~1.2k vertices)
+
+plot_districts picks the coarsest level whose tolerance is still smaller than
+a pixel of the output, so the map looks the same.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+
+import pandas as pd
+import geopandas as gpd
+
+from district_layer import load_districts, write_district_cache
+import project_paths
+
+#%% --- Building the pyramid ---
+
+#Simplification tolerance of each level, in degrees (EPSG:4326)
+pyramid_tolerances = [0.0, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005]
+
+def build_geometry_pyramid(districts, tolerances = pyramid_tolerances, id_column = "OBJECTID"):
+    """Simplify a district layer at every level of detail.
+
+    Arguments:
+        districts (geopandas.GeoDataFrame): The district layer.
+        tolerances (list): Simplification tolerance of each level, in the
+            units of the layer's crs. A tolerance of 0 keeps the geometry.
+        id_column (str): The column that identifies a district.
+
+    Returns:
+        geopandas.GeoDataFrame: One row per district and level with the
+            id_column, level, tolerance and geometry columns.
+    """
+    levels = []
+    for level, tolerance in enumerate(tolerances):
+        geometry = districts.geometry if tolerance == 0 else districts.geometry.simplify_coverage(tolerance)
+        levels.append(gpd.GeoDataFrame({id_column: districts.loc[:,id_column].to_numpy(),
+                                        "level": level,
+                                        "tolerance": tolerance},
+                                       geometry = geometry.to_numpy(),
+                                       crs = districts.crs))
+
+    return pd.concat(levels, ignore_index = True)
+
+
+def write_pyramid_cache(pyramid, parquet_fp = project_paths.istanbul_districts_pyramid_fp):
+    #Level 0 is the district layer itself, it is not stored twice
+    write_district_cache(pyramid.loc[pyramid.loc[:,"level"] > 0,:], parquet_fp)
+
+
+def load_pyramid_level(level, parquet_fp = project_paths.istanbul_districts_pyramid_fp):
+    """Load a single simplified level (1 or more) of the Istanbul pyramid.
+
+    The other levels are skipped by the Parquet reader. When the cache has
+    not been built yet, the level is computed from the district layer.
+
+    Returns:
+        geopandas.GeoDataFrame: OBJECTID, level, tolerance and geometry.
+    """
+    if os.path.exists(parquet_fp):
+        return gpd.read_parquet(parquet_fp, filters = [("level", "==", level)])
+
+    pyramid = build_geometry_pyramid(load_districts(["OBJECTID"]), pyramid_tolerances[:level + 1])
+    return pyramid.loc[pyramid.loc[:,"level"] == level,:].reset_index(drop = True)
+
+#%% --- Picking a level ---
+
+def pick_level(bounds, width_inches, height_inches, dpi, tolerances = pyramid_tolerances):
+    """Pick the coarsest level that is still finer than a pixel.
+
+    Arguments:
+        bounds (tuple): (minx, miny, maxx, maxy) of the area that is drawn.
+        width_inches (float): Width of the axes on the figure.
+        height_inches (float): Height of the axes on the figure.
+        dpi (float): Resolution of the output.
+        tolerances (list): The tolerances of the pyramid, finest first.
+
+    Returns:
+        int: The level.
+    """
+    minx, miny, maxx, maxy = bounds
+
+    #Size of a pixel in the units of the map, the smaller side counts
+    pixel_size = min((maxx - minx) / (width_inches * dpi),
+                     (maxy - miny) / (height_inches * dpi))
+
+    level = 0
+    for candidate, tolerance in enumerate(tolerances):
+        if tolerance <= pixel_size:
+            level = candidate
+    return level
+
+
+def plot_districts(districts, ax, dpi = 300, id_column = "OBJECTID",
+                   parquet_fp = project_paths.istanbul_districts_pyramid_fp, **plot_kwargs):
+    """Plot a district layer at the level of detail of the output.
+
+    Use it in place of districts.plot(ax = ax, ...). The figure size should be
+    set before calling it.
+
+    Arguments:
+        districts (geopandas.GeoDataFrame): The districts to plot, with the
+            id_column and the columns to color by.
+        ax (matplotlib.axes.Axes): The axes to plot on.
+        dpi (float): Resolution the figure will be saved at.
+        id_column (str): The column that links the districts to the pyramid.
+        parquet_fp (str): Filepath of the pyramid cache.
+        **plot_kwargs: Passed on to GeoDataFrame.plot (column, cmap...).
+
+    Returns:
+        matplotlib.axes.Axes: The axes.
+    """
+    axes_box = ax.get_position()
+    width_inches = axes_box.width * ax.figure.get_figwidth()
+    height_inches = axes_box.height * ax.figure.get_figheight()
+
+    level = pick_level(districts.total_bounds, width_inches, height_inches, dpi)
+    if level != 0:
+        simplified = load_pyramid_level(level, parquet_fp).set_index(id_column).geometry
+        districts = districts.set_geometry(simplified.reindex(districts.loc[:,id_column]).to_numpy(),
+                                           crs = districts.crs)
+
+    return districts.plot(ax = ax, **plot_kwargs)
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #write_pyramid_cache(build_geometry_pyramid(load_districts()))
+    pass
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:08:19 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module holds the in-memory dtypes of the cleaned health services data.
+
+Most text columns of the cleaned data only take a handful of values (39
+districts, ~30 institution types, Yes/No...), repeated over thousands of rows.
+Held as python strings, every row carries its own copy. Held as a pandas
+categorical, every row is a small integer code into one shared list of
+categories, which cuts the memory use several-fold and makes value_counts and
+groupby work on integers.
+
+The categories are FIXED: they come from the corrected district lists and the
+institution type table, not from whatever values a given file or chunk
+happens to hold. This way every script and every chunk uses the same codes.
+
+n#_beds, latitude and longitude are held as float32. For coordinates around
+Istanbul float32 still resolves well under a metre. The files on disk keep
+float64, only the loaded frames are compacted.
+
+Note: A categorical column "knows" all of its categories, so value_counts on
+a filtered frame also lists the categories that are not there, with a count
+of zero. Use .cat.remove_unused_categories() before counting and
+groupby(..., observed = True) when only the present values are wanted.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+import warnings
+
+import pandas as pd
+
+#%% --- Vocabularies ---
+
+#Corrected district names, in the order of the raw ILCE_ADI values
+unique_districts_tr_corrected = ["Kadıköy", "Fatih", "Tuzla", "Gaziosmanpaşa",
+                                 "Üsküdar", "Adalar", "Sarıyer", "Arnavutköy",
+                                 "Silivri", "Çatalca", "Küçükçekmece", "Beyoğlu",
+                                 "Şile", "Kartal", "Şişli", "Beşiktaş", "Kağıthane",
+                                 "Esenyurt", "Bahçelievler", "Avcılar", "Başakşehir",
+                                 "Sultangazi", "Maltepe", "Sancaktepe", "Beykoz",
+                                 "Büyükçekmece", "Bakırköy", "Pendik", "Bağcılar",
+                                 "Esenler", "Beylikdüzü", "Ümraniye", "Eyüpsultan",
+                                 "Çekmeköy", "Ataşehir", "Sultanbeyli", "Zeytinburnu",
+                                 "Güngören", "Bayrampaşa"]
+
+unique_districts_eng_corrected = ["Kadikoy", "Fatih", "Tuzla", "Gaziosmanpasa",
+                                 "Uskudar", "Adalar", "Sariyer", "Arnavutkoy",
+                                 "Silivri", "Catalca", "Kucukcekmece", "Beyoglu",
+                                 "Sile", "Kartal", "Sisli", "Besiktas", "Kagithane",
+                                 "Esenyurt", "Bahcelievler", "Avcilar", "Basaksehir",
+                                 "Sultangazi", "Maltepe", "Sancaktepe", "Beykoz",
+                                 "Buyukcekmece", "Bakirkoy", "Pendik", "Bagcilar",
+                                 "Esenler", "Beylikduzu", "Umraniye", "Eyupsultan",
+                                 "Cekmekoy", "Atasehir", "Sultanbeyli", "Zeytinburnu",
+                                 "Gungoren", "Bayrampasa"]
+
+#The keyed institution type table of the cleaning pipeline
+institution_type_table_fp = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         "institution_type_table.csv")
+
+institution_type_table = pd.read_csv(institution_type_table_fp,
+                                     index_col = "raw_institution_type",
+                                     encoding = "utf-8")
+
+def table_vocabulary(column):
+    return sorted(institution_type_table.loc[:,column].dropna().unique())
+
+#Categories are sorted so that groupby output keeps the alphabetical order
+#that the string columns had
+health_vocabularies = {"district_tr": sorted(unique_districts_tr_corrected),
+                       "district_eng": sorted(unique_districts_eng_corrected),
+                       "institution_type": table_vocabulary("institution_type"),
+                       "private_or_public": ["Private", "Public"],
+                       "institution_type_eng": table_vocabulary("institution_type_eng"),
+                       "institution_type_abbrv_tr": table_vocabulary("institution_type_abbrv_tr"),
+                       "institution_type_abbrv_eng": table_vocabulary("institution_type_abbrv_eng"),
+                       "care_type": table_vocabulary("care_type"),
+                       "icu": ["No", "Yes"],
+                       "ambulance": ["No", "Yes"],
+                       "related_to_htourism": ["No", "Yes"],
+                       "district_from_geometry": sorted(unique_districts_tr_corrected),
+                       "district_check": ["Matches", "No coordinates", "Other district", "Outside province"],
+                       "continent": ["anat", "eur"]}
+
+health_category_dtypes = {column: pd.CategoricalDtype(categories)
+                          for column, categories in health_vocabularies.items()}
+
+health_numeric_dtypes = {"n#_beds": "float32",
+                         "latitude": "float32",
+                         "longitude": "float32"}
+
+#%% --- Applying the dtypes ---
+
+def to_categorical(column, category_dtypes = health_category_dtypes):
+    """Convert a column to its fixed categorical dtype.
+
+    Values that are missing from the vocabulary (e.g. a new institution type
+    that the table does not know yet) are not thrown away: they are added to
+    the end of the categories and a warning is raised.
+
+    Arguments:
+        column (pandas.Series): A column with a vocabulary in health_vocabularies.
+        category_dtypes (dict): Column name -> pandas.CategoricalDtype.
+
+    Returns:
+        pandas.Series: The categorical column.
+    """
+    dtype = category_dtypes[column.name]
+
+    unknown_values = set(column.dropna().unique()) - set(dtype.categories)
+    if unknown_values:
+        warnings.warn("{} has values missing from its vocabulary: {}".format(column.name,
+                                                                             sorted(unknown_values)))
+        dtype = pd.CategoricalDtype(list(dtype.categories) + sorted(unknown_values))
+
+    return column.astype(dtype)
+
+
+def apply_health_dtypes(dataframe, compact_numbers = True, category_dtypes = health_category_dtypes):
+    """Convert the columns of a health services frame to their in-memory dtypes.
+
+    Only the columns that are in the frame are converted.
+
+    Arguments:
+        dataframe (pandas.DataFrame): Cleaned health services data.
+        compact_numbers (bool): Also downcast n#_beds, latitude and longitude
+            to float32. Keep this False for frames that are written back to disk.
+        category_dtypes (dict): Column name -> pandas.CategoricalDtype. The
+            default is the Istanbul vocabulary.
+
+    Returns:
+        pandas.DataFrame: The same dataframe, for chaining.
+    """
+    for column in dataframe.columns.intersection(list(category_dtypes)):
+        dataframe[column] = to_categorical(dataframe.loc[:,column], category_dtypes)
+
+    if compact_numbers:
+        for column in dataframe.columns.intersection(list(health_numeric_dtypes)):
+            dataframe[column] = dataframe.loc[:,column].astype(health_numeric_dtypes[column])
+
+    return dataframe
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:20:48 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module turns the health services cells of the raw data cleaner into a
+streaming pipeline. The raw csv is read in chunks of a fixed number of rows,
+every chunk goes through the same list of cleaning stages and is appended to
+the cleaned csv right away. Only one chunk is ever held in memory, so the
+peak memory use does not grow with the size of the input file.
+
+Every stage is a function that accepts a chunk and returns it cleaned. None
+of them look at the other chunks. This is why the district names and the
+institution types are mapped with explicit keys (institution_type_table.csv
+for the types) instead of the order of .unique() / .value_counts() over the
+whole dataset.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+import pandas as pd
+
+from turkish_text_repair import repair_columns
+from rule_classifier import read_rules, compile_rules, apply_rules
+from name_normalization import istanbul_district_index
+from district_assignment import locate_districts
+from dividing_line import tag_continent
+from health_schema import (institution_type_table,
+                           health_category_dtypes,
+                           apply_health_dtypes)
+from healthservices_columnar_store import write_cleaned_chunks
+import project_paths
+
+#%% --- Stage definitions: Column drop and rename ---
+
+#The columns to keep and their new names. TELEFON, WEBSITESI and ILCE_UAVT
+#are dropped by not reading them at all.
+raw_columns_in_english = {"_id": "institution_id",
+                          "ILCE_ADI": "district_tr",
+                          "ADI": "institution_name",
+                          "ALT_KATEGORI": "institution_type",
+                          "ADRES": "address",
+                          "ACIL_SERVIS": "icu",
+                          "YATAK": "n#_beds",
+                          "AMBULANS": "ambulance",
+                          "MAHALLE": "neighborhood_tr",
+                          "ENLEM": "latitude",
+                          "BOYLAM": "longitude"}
+
+#Fixing the dtypes keeps every chunk consistent, no matter what it contains
+raw_dtypes = {"_id": "int64",
+              "ILCE_ADI": object, "ADI": object,
+              "ALT_KATEGORI": object, "ADRES": object,
+              "ACIL_SERVIS": object, "YATAK": "float64",
+              "AMBULANS": object, "MAHALLE": object,
+              "ENLEM": "float64", "BOYLAM": "float64"}
+
+#Column order of the cleaned dataset
+cleaned_columns = ["institution_id", "district_tr", "institution_name",
+                   "institution_type", "address", "icu", "n#_beds",
+                   "ambulance", "neighborhood_tr", "latitude", "longitude",
+                   "district_eng", "private_or_public", "related_to_htourism",
+                   "institution_type_eng", "institution_type_abbrv_tr",
+                   "institution_type_abbrv_eng", "care_type",
+                   "district_from_geometry", "district_check", "continent"]
+
+def rename_columns(chunk):
+    return chunk.rename(columns = raw_columns_in_english)
+
+#%% --- Stage definitions: District mapping ---
+
+#The raw ILCE_ADI values ("KADIKÖY", "GAZÝOSMANPAÞA"...) are looked up in the
+#district index of name_normalization.py. It folds every spelling to the same
+#key, so the raw names do not have to be listed here. The canonical names are
+#the corrected lists of health_schema.py.
+
+def map_districts(chunk, district_index = None):
+    #Other provinces pass their own index
+    district_index = district_index or istanbul_district_index()
+    chunk.loc[:,"district_eng"] = district_index.to_eng(chunk.loc[:,"district_tr"])
+    chunk.loc[:,"district_tr"] = district_index.to_tr(chunk.loc[:,"district_tr"])
+    return chunk
+
+#%% --- Stage definitions: Mojibake repair ---
+
+def repair_text(chunk):
+    repair_columns(chunk, ["neighborhood_tr"], case = "title")
+    repair_columns(chunk, ["institution_name", "institution_type", "address"])
+    return chunk
+
+#%% --- Stage definitions: Type filtering ---
+
+unwanted_institution_types = ["Optik", "Medikal", "Laboratuvar",
+                              "Laboratuvar Özel", "Diş Laboratuvari",
+                              "İşitme Cihazi Satiş ve Uygulama Merkezi",
+                              "Protez-Ortez Yapim ve Uygulama Merkezi",
+                              "Protez-Ortez Yapim ve Uygulama Merkezi Özel",
+                              "Ambulans"]
+
+def filter_institution_types(chunk):
+    wanted_institution_types_mask = chunk.loc[:,"institution_type"].isin(unwanted_institution_types) == False
+    return chunk.loc[wanted_institution_types_mask,:].copy()
+
+#%% --- Stage definitions: Institution type table ---
+
+#A keyed translation table: every raw (repaired) ALT_KATEGORI value maps to
+#its harmonized Turkish type, ownership, English name, abbreviations and
+#care type. "Devlet Hastanesi", "Özel Hastane" and "Eğitim Araştirma Hastanesi"
+#all end up as "Hastane", etc. New type codes from other provinces are new
+#rows in the csv, they do not cost another pass over the data.
+#The table itself is read in health_schema.py, it also holds the vocabularies
+#of the categorical columns.
+
+def join_institution_type_table(chunk):
+    #One hash pass: raw type -> row of the table, -1 if the type is not in it
+    type_codes = pd.Categorical(chunk.loc[:,"institution_type"],
+                                categories = institution_type_table.index).codes
+    unmatched_mask = type_codes == -1
+
+    #Every output column is then a single take from the table. The NaN added
+    #to the end of each column is what the -1 codes pick up.
+    raw_institution_type = chunk.loc[:,"institution_type"].to_numpy(dtype = object)
+    for column in institution_type_table.columns:
+        column_values = np.append(institution_type_table.loc[:,column].to_numpy(dtype = object), np.nan)
+        chunk.loc[:,column] = column_values[type_codes]
+
+    #Types that are not in the table keep their raw name. The rule engine
+    #splits them into private / public and harmonizes them in the next stage.
+    if unmatched_mask.any():
+        chunk.loc[unmatched_mask,"institution_type"] = raw_institution_type[unmatched_mask]
+        chunk.loc[unmatched_mask,"care_type"] = "not specified"
+
+    return chunk
+
+#%% --- Stage definitions: Rule based tagging ---
+
+#Private / public split, "Devlet" / "Fizik Tedavi" / "Ağiz Diş" fixes and
+#health tourism tagging (aka beauty center, health transplant center etc.)
+#all come from institution_classification_rules.csv. Each column is scanned
+#once, no matter how many rules there are.
+classification_rules = compile_rules(read_rules())
+
+def classify_institutions(chunk):
+    #The type rules only run on the types the table did not know, the table
+    #already holds the ownership and the harmonized name of the others
+    unmatched_mask = chunk.loc[:,"institution_type_eng"].isna()
+    return apply_rules(chunk, classification_rules,
+                       row_masks = {"institution_type": unmatched_mask})
+
+#%% --- Stage definitions: Yes / no translation ---
+
+def translate_yes_no(chunk):
+    #Correcting "Yok/Var" in icu and ambulance rows
+    correction_dict = {"Var" : "Yes", "Yok": "No" }
+    for column in ["icu", "ambulance"]:
+        chunk.loc[:,column] = chunk.loc[:,column].map(correction_dict)
+    return chunk
+
+#%% --- Stage definitions: District check ---
+
+#locate_districts (district_assignment.py) finds the district polygon that the
+#coordinates fall in and compares it with district_tr. It runs last, once the
+#unwanted types are filtered out.
+
+#tag_continent (dividing_line.py) then adds the side of the Bosphorus that the
+#coordinates are on, "eur" or "anat".
+
+#%% --- The pipeline ---
+
+#The stages in the order they are applied to each chunk
+cleaning_stages = [rename_columns,
+                   map_districts,
+                   repair_text,
+                   filter_institution_types,
+                   join_institution_type_table,
+                   classify_institutions,
+                   translate_yes_no,
+                   locate_districts,
+                   tag_continent]
+
+def clean_chunk(chunk, stages = cleaning_stages, category_dtypes = health_category_dtypes):
+    """Run a chunk of the raw health services data through the cleaning stages.
+
+    Arguments:
+        chunk (pandas.DataFrame): A chunk of the raw csv.
+        stages (list): The stage functions to apply, in order.
+        category_dtypes (dict): Categorical dtypes of the text columns. Other
+            provinces pass their own district vocabularies.
+
+    Returns:
+        pandas.DataFrame: The cleaned chunk with the cleaned dataset's columns.
+            The repetitive text columns are categoricals with the shared
+            vocabularies of health_schema.py.
+    """
+    for stage in stages:
+        chunk = stage(chunk)
+
+    return apply_health_dtypes(chunk.reindex(columns = cleaned_columns),
+                               compact_numbers = False,
+                               category_dtypes = category_dtypes)
+
+
+def read_raw_chunks(raw_fp = project_paths.health_raw_fp, chunksize = 50000):
+    """Open the raw health services csv as an iterator of chunks.
+
+    Arguments:
+        raw_fp (str): Filepath of the raw csv.
+        chunksize (int): Number of raw rows per chunk. This bounds the memory use.
+
+    Returns:
+        pandas.io.parsers.TextFileReader: Raw chunks with the kept columns only.
+    """
+    return pd.read_csv(raw_fp,
+                       usecols = list(raw_columns_in_english),
+                       dtype = raw_dtypes,
+                       chunksize = chunksize)
+
+
+def iter_cleaned_chunks(raw_fp = project_paths.health_raw_fp, chunksize = 50000,
+                        stages = cleaning_stages, category_dtypes = health_category_dtypes):
+    """Read the raw health services csv chunk by chunk and yield cleaned chunks.
+
+    Arguments:
+        raw_fp (str): Filepath of the raw csv.
+        chunksize (int): Number of raw rows per chunk. This bounds the memory use.
+        stages (list): See clean_chunk.
+        category_dtypes (dict): See clean_chunk.
+
+    Yields:
+        pandas.DataFrame: Cleaned chunks, in file order.
+    """
+    for chunk in read_raw_chunks(raw_fp, chunksize):
+        yield clean_chunk(chunk, stages, category_dtypes)
+
+
+def clean_health_services(raw_fp = project_paths.health_raw_fp,
+                          cleaned_fp = project_paths.health_cleaned_fp,
+                          parquet_fp = project_paths.health_parquet_fp,
+                          chunksize = 50000,
+                          stages = cleaning_stages,
+                          category_dtypes = health_category_dtypes):
+    """Clean the raw health services csv and write the cleaned data incrementally.
+
+    Arguments:
+        raw_fp (str): Filepath of the raw csv.
+        cleaned_fp (str): Filepath of the cleaned csv. It is overwritten.
+        parquet_fp (str): Filepath of the Parquet copy that the analysis
+            scripts read. It is overwritten. None skips it.
+        chunksize (int): Number of raw rows per chunk.
+        stages (list): See clean_chunk.
+        category_dtypes (dict): See clean_chunk.
+
+    Returns:
+        int: Number of rows written.
+    """
+    return write_cleaned_chunks(iter_cleaned_chunks(raw_fp, chunksize, stages, category_dtypes),
+                                cleaned_fp,
+                                parquet_fp)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:05:31 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module writes and reads the columnar (Parquet) copy of the cleaned
+health services dataset.
+
+The analysis scripts used to parse the cleaned csv on every run, guessing the
+dtypes of 18 columns and decoding all of the text again. The Parquet file
+stores the dtypes with the data, keeps the repetitive text columns
+dictionary-encoded and lets a script read only the columns it needs.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+from contextlib import nullcontext
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from health_schema import apply_health_dtypes
+import project_paths
+
+#%% --- Schema of the cleaned dataset ---
+
+cleaned_schema = pa.schema([("institution_id", pa.int64()),
+                            ("district_tr", pa.string()),
+                            ("institution_name", pa.string()),
+                            ("institution_type", pa.string()),
+                            ("address", pa.string()),
+                            ("icu", pa.string()),
+                            ("n#_beds", pa.float64()),
+                            ("ambulance", pa.string()),
+                            ("neighborhood_tr", pa.string()),
+                            ("latitude", pa.float64()),
+                            ("longitude", pa.float64()),
+                            ("district_eng", pa.string()),
+                            ("private_or_public", pa.string()),
+                            ("related_to_htourism", pa.string()),
+                            ("institution_type_eng", pa.string()),
+                            ("institution_type_abbrv_tr", pa.string()),
+                            ("institution_type_abbrv_eng", pa.string()),
+                            ("care_type", pa.string()),
+                            ("district_from_geometry", pa.string()),
+                            ("district_check", pa.string()),
+                            ("continent", pa.string())])
+
+#Low cardinality text columns. These are stored dictionary-encoded: every
+#distinct value is written once and the rows only hold small integer codes.
+#Names and addresses are (almost) unique, so a dictionary would not help them.
+dictionary_encoded_columns = ["district_tr", "institution_type", "icu",
+                              "ambulance", "neighborhood_tr", "district_eng",
+                              "private_or_public", "related_to_htourism",
+                              "institution_type_eng", "institution_type_abbrv_tr",
+                              "institution_type_abbrv_eng", "care_type",
+                              "district_from_geometry", "district_check", "continent"]
+
+#Dtypes to use when the cleaned csv has to be parsed
+cleaned_csv_dtypes = {field.name: field.type.to_pandas_dtype() for field in cleaned_schema}
+
+#%% --- Writing ---
+
+class HealthParquetWriter:
+    """Append cleaned chunks to the Parquet copy of the cleaned dataset.
+
+    Each chunk becomes a row group, so the writer never needs more than one
+    chunk in memory. Use it as a context manager:
+
+        with HealthParquetWriter(fp) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, parquet_fp = project_paths.health_parquet_fp):
+        self.parquet_fp = parquet_fp
+        self.writer = pq.ParquetWriter(parquet_fp,
+                                       cleaned_schema,
+                                       use_dictionary = dictionary_encoded_columns,
+                                       compression = "snappy")
+
+    def write(self, chunk):
+        table = pa.Table.from_pandas(chunk,
+                                     schema = cleaned_schema,
+                                     preserve_index = False)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def remove_temporary_files(*fps):
+    #Left behind by a write that failed
+    for fp in fps:
+        if fp and os.path.exists(fp):
+            os.remove(fp)
+
+
+def write_cleaned_chunks(chunks,
+                         cleaned_fp = project_paths.health_cleaned_fp,
+                         parquet_fp = project_paths.health_parquet_fp):
+    """Write cleaned chunks to the cleaned csv and its Parquet copy in one pass.
+
+    Both files are written next to the old ones (.tmp) and only replace them
+    once every chunk is written, so a chunk that fails leaves the old files
+    as they were. The chunks may be read from the old files.
+
+    Arguments:
+        chunks (iterable): Cleaned pandas.DataFrame chunks.
+        cleaned_fp (str): Filepath of the cleaned csv. It is overwritten.
+        parquet_fp (str): Filepath of the Parquet copy. It is overwritten.
+            None skips it.
+
+    Returns:
+        int: Number of rows written.
+    """
+    n_rows = 0
+    temporary_cleaned_fp = cleaned_fp + ".tmp"
+    temporary_parquet_fp = parquet_fp + ".tmp" if parquet_fp else None
+
+    try:
+        #Keep a single handle open so the utf-8-sig BOM is written only once
+        with open(temporary_cleaned_fp, "w", encoding = "utf-8-sig", newline = "") as cleaned_file:
+            with (HealthParquetWriter(temporary_parquet_fp) if parquet_fp else nullcontext()) as parquet_writer:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(cleaned_file, header = i == 0, index = False)
+                    if parquet_writer:
+                        parquet_writer.write(chunk)
+                    n_rows += len(chunk)
+    except BaseException:
+        remove_temporary_files(temporary_cleaned_fp, temporary_parquet_fp)
+        raise
+
+    os.replace(temporary_cleaned_fp, cleaned_fp)
+    if parquet_fp:
+        os.replace(temporary_parquet_fp, parquet_fp)
+
+    return n_rows
+
+
+def csv_to_parquet(cleaned_fp = project_paths.health_cleaned_fp,
+                   parquet_fp = project_paths.health_parquet_fp,
+                   chunksize = 50000):
+    """Build the Parquet copy straight from an existing cleaned csv.
+
+    Arguments:
+        cleaned_fp (str): Filepath of the cleaned csv.
+        parquet_fp (str): Filepath of the Parquet file. It is overwritten.
+        chunksize (int): Number of rows per row group.
+    """
+    reader = pd.read_csv(cleaned_fp,
+                         dtype = cleaned_csv_dtypes,
+                         chunksize = chunksize)
+
+    #Same as above: the old file stays until the new one is complete
+    try:
+        with HealthParquetWriter(parquet_fp + ".tmp") as writer:
+            for chunk in reader:
+                writer.write(chunk)
+    except BaseException:
+        remove_temporary_files(parquet_fp + ".tmp")
+        raise
+
+    os.replace(parquet_fp + ".tmp", parquet_fp)
+
+#%% --- Reading ---
+
+def load_health(columns = None,
+                parquet_fp = project_paths.health_parquet_fp,
+                cleaned_fp = project_paths.health_cleaned_fp):
+    """Load the cleaned health services dataset.
+
+    Arguments:
+        columns (list): The columns to read. None reads all of them. Columns
+            that are not asked for are never decoded.
+        parquet_fp (str): Filepath of the Parquet copy.
+        cleaned_fp (str): Filepath of the cleaned csv. It is only used when
+            the Parquet copy has not been built yet.
+
+    Returns:
+        pandas.DataFrame: The cleaned health services data. The repetitive
+            text columns are categoricals with fixed categories and the
+            numeric columns are float32 (see health_schema.py).
+    """
+    if os.path.exists(parquet_fp):
+        health = pd.read_parquet(parquet_fp, columns = columns)
+    else:
+        #The schema's dtypes, as in iter_health_chunks. The free text columns
+        #are left to pandas' own string dtype, as the Parquet copy reads them.
+        dtypes = {column: dtype for column, dtype in cleaned_csv_dtypes.items()
+                  if not pd.api.types.is_object_dtype(dtype) and (columns is None or column in columns)}
+        health = pd.read_csv(cleaned_fp, usecols = columns, dtype = dtypes)
+        if columns is not None:
+            health = health.loc[:,list(columns)]
+
+    return apply_health_dtypes(health)
+
+
+def iter_health_chunks(chunksize = 50000,
+                       parquet_fp = project_paths.health_parquet_fp,
+                       cleaned_fp = project_paths.health_cleaned_fp):
+    """Yield the cleaned health services dataset chunk by chunk.
+
+    Arguments:
+        chunksize (int): Maximum number of rows per chunk.
+        parquet_fp (str): Filepath of the Parquet copy.
+        cleaned_fp (str): Filepath of the cleaned csv, used when the Parquet
+            copy has not been built yet.
+
+    Yields:
+        pandas.DataFrame: Chunks of the cleaned data, in file order.
+    """
+    if os.path.exists(parquet_fp):
+        for batch in pq.ParquetFile(parquet_fp).iter_batches(batch_size = chunksize):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(cleaned_fp, dtype = cleaned_csv_dtypes, chunksize = chunksize):
+            yield chunk
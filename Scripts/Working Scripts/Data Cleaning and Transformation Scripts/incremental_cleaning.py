@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:10:22 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module runs the cleaning pipeline incrementally.
+
+The municipality republishes the whole health services file even when only a
+few institutions change. Every raw row gets a content hash, stored per _id.
+On the next refresh only the rows that are new or whose hash changed go
+through the cleaning stages. The results are merged into the stored cleaned
+dataset and every added, removed and modified institution is written to a
+change log.
+
+Hashing the raw file and rewriting the merged output are still one pass over
+the data each, but both are cheap next to the cleaning stages, which now only
+see the delta.
+
+If the cleaning stages themselves change (e.g. a new row in
+institution_type_table.csv), run with full_refresh = True so that every row is
+cleaned again.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from healthservices_cleaning_pipeline import read_raw_chunks, clean_chunk
+from healthservices_columnar_store import iter_health_chunks, write_cleaned_chunks
+import project_paths
+
+#%% --- Row hashes ---
+
+def hash_raw_rows(chunk):
+    """Compute a 64-bit content hash for every row of a raw chunk.
+
+    Only the columns that the cleaner reads are hashed, so a changed phone
+    number or website does not trigger a re-clean.
+
+    Arguments:
+        chunk (pandas.DataFrame): A chunk of the raw csv.
+
+    Returns:
+        numpy.ndarray: uint64 hashes, one per row.
+    """
+    return pd.util.hash_pandas_object(chunk, index = False).to_numpy()
+
+
+def load_row_hashes(hashes_fp = project_paths.health_row_hashes_fp):
+    """Load the stored row hashes as a series of hashes indexed by _id."""
+    if not os.path.exists(hashes_fp):
+        return pd.Series(np.array([], dtype = "uint64"),
+                         index = pd.Index([], dtype = "int64", name = "institution_id"))
+
+    stored = pd.read_parquet(hashes_fp)
+    return pd.Series(stored.loc[:,"row_hash"].to_numpy(),
+                     index = pd.Index(stored.loc[:,"institution_id"], name = "institution_id"))
+
+#%% --- Incremental refresh ---
+
+def refresh_health_services(raw_fp = project_paths.health_raw_fp,
+                            cleaned_fp = project_paths.health_cleaned_fp,
+                            parquet_fp = project_paths.health_parquet_fp,
+                            hashes_fp = project_paths.health_row_hashes_fp,
+                            changelog_fp = project_paths.health_changelog_fp,
+                            chunksize = 50000,
+                            full_refresh = False):
+    """Re-clean only the new and changed institutions of the raw file.
+
+    When there is no stored cleaned dataset (a first run, or the cleaned
+    files were deleted), every row is cleaned, as with full_refresh.
+
+    The merged dataset keeps the row order of the raw file. The change log
+    compares the cleaned datasets: an institution that the cleaning drops
+    (e.g. an institution type that is filtered out) is never "added", and a
+    stored one that is now dropped is "removed".
+
+    Arguments:
+        raw_fp (str): Filepath of the newly published raw csv.
+        cleaned_fp (str): Filepath of the stored cleaned csv.
+        parquet_fp (str): Filepath of the stored Parquet copy.
+        hashes_fp (str): Filepath of the stored row hashes.
+        changelog_fp (str): Filepath of the change log. New entries are appended.
+        chunksize (int): Number of rows per chunk.
+        full_refresh (bool): Ignore the stored hashes and clean every row.
+
+    Returns:
+        pandas.DataFrame: This run's change log, with the columns
+            refreshed_at, institution_id and change
+            ("added", "removed" or "modified").
+    """
+    has_stored_data = os.path.exists(parquet_fp) or os.path.exists(cleaned_fp)
+    #Without stored cleaned rows there is nothing to keep: clean them all
+    clean_every_row = full_refresh or not has_stored_data
+
+    #The stored hashes still tell which rows were modified, for the change log
+    previous_hashes = load_row_hashes(hashes_fp)
+    previous_ids = previous_hashes.index
+    previous_values = previous_hashes.to_numpy()
+
+    id_parts, hash_parts, cleaned_delta, modified_parts = [], [], [], []
+
+    for chunk in read_raw_chunks(raw_fp, chunksize):
+        ids = chunk.loc[:,"_id"].to_numpy()
+        row_hashes = hash_raw_rows(chunk)
+
+        #Look every _id up in the stored hashes, -1 means we never saw it
+        positions = previous_ids.get_indexer(ids)
+        is_new = positions == -1
+        is_modified = np.zeros(len(ids), dtype = bool)
+        is_modified[~is_new] = previous_values[positions[~is_new]] != row_hashes[~is_new]
+
+        #Only the delta goes through the cleaning stages
+        changed_mask = np.ones(len(ids), dtype = bool) if clean_every_row else is_new | is_modified
+        if changed_mask.any():
+            cleaned_delta.append(clean_chunk(chunk.loc[changed_mask,:].copy()))
+
+        modified_parts.append(ids[is_modified])
+        id_parts.append(ids)
+        hash_parts.append(row_hashes)
+
+    raw_ids = np.concatenate(id_parts) if id_parts else np.array([], dtype = "int64")
+    modified = np.concatenate(modified_parts) if modified_parts else np.array([], dtype = "int64")
+
+    # --- Merge into the stored cleaned dataset ---
+
+    #Every row goes to its place in the raw file
+    raw_position = pd.Series(np.arange(len(raw_ids)), index = raw_ids)
+    cleaned_delta = pd.concat(cleaned_delta, ignore_index = True) if cleaned_delta else pd.DataFrame()
+    if len(cleaned_delta):
+        delta_position = raw_position.reindex(cleaned_delta.loc[:,"institution_id"]).to_numpy()
+        cleaned_delta = cleaned_delta.iloc[np.argsort(delta_position, kind = "stable")].reset_index(drop = True)
+        delta_position = np.sort(delta_position)
+        delta_ids = cleaned_delta.loc[:,"institution_id"].to_numpy()
+    else:
+        delta_position = delta_ids = np.array([], dtype = "int64")
+
+    stored_id_parts, merged_id_parts = [], []
+
+    def merged_chunks():
+        #The stored rows are in the order of the raw file already: each stored
+        #chunk takes the delta rows that come before its last row
+        n_emitted = 0
+        if has_stored_data:
+            for stored_chunk in iter_health_chunks(chunksize, parquet_fp, cleaned_fp):
+                stored_ids = stored_chunk.loc[:,"institution_id"].to_numpy()
+                stored_id_parts.append(stored_ids)
+                if clean_every_row:
+                    continue
+
+                #Kept: still in the raw file and not re-cleaned
+                keep_mask = (np.isin(stored_ids, raw_ids)
+                             & ~np.isin(stored_ids, modified)
+                             & ~np.isin(stored_ids, delta_ids))
+                kept = stored_chunk.loc[keep_mask,:]
+                kept_position = raw_position.reindex(kept.loc[:,"institution_id"]).to_numpy()
+                n_delta = np.searchsorted(delta_position, kept_position.max(), side = "right") if len(kept) else n_emitted
+                delta_part = cleaned_delta.iloc[n_emitted:max(n_delta, n_emitted)]
+                n_emitted = max(n_delta, n_emitted)
+
+                merged = pd.concat([kept, delta_part]) if len(delta_part) else kept
+                merged_position = raw_position.reindex(merged.loc[:,"institution_id"]).to_numpy()
+                merged = merged.iloc[np.argsort(merged_position, kind = "stable")]
+                merged_id_parts.append(merged.loc[:,"institution_id"].to_numpy())
+                yield merged
+
+        rest = cleaned_delta.iloc[n_emitted:]
+        if len(rest):
+            merged_id_parts.append(rest.loc[:,"institution_id"].to_numpy())
+            yield rest
+
+    #write_cleaned_chunks writes next to the old files, which are still being read
+    write_cleaned_chunks(merged_chunks(), cleaned_fp, parquet_fp)
+
+    # --- Store the new hashes ---
+
+    new_hashes = pd.DataFrame({"institution_id": raw_ids,
+                               "row_hash": np.concatenate(hash_parts) if hash_parts else np.array([], dtype = "uint64")})
+    new_hashes.to_parquet(hashes_fp, index = False)
+
+    # --- Change log ---
+
+    stored_ids = np.concatenate(stored_id_parts) if stored_id_parts else np.array([], dtype = "int64")
+    merged_ids = np.concatenate(merged_id_parts) if merged_id_parts else np.array([], dtype = "int64")
+    added = merged_ids[~np.isin(merged_ids, stored_ids)]
+    removed = stored_ids[~np.isin(stored_ids, merged_ids)]
+    modified = modified[np.isin(modified, merged_ids) & np.isin(modified, stored_ids)]
+
+    changelog = pd.concat([pd.DataFrame({"institution_id": added, "change": "added"}),
+                           pd.DataFrame({"institution_id": removed, "change": "removed"}),
+                           pd.DataFrame({"institution_id": modified, "change": "modified"})],
+                          ignore_index = True)
+    changelog.insert(0, "refreshed_at", datetime.now().isoformat(timespec = "seconds"))
+
+    changelog.to_csv(changelog_fp,
+                     mode = "a",
+                     header = not os.path.exists(changelog_fp),
+                     index = False,
+                     encoding = "utf-8")
+
+    return changelog
@@ -24,8 +24,12 @@ from shapely.ops import nearest_points
 tr_borders_level_2_fp = "../../../Data/GIS data/Raw/Turkey_administrative_borders/tur_polbnda_adm2.shp"
 
 #Make it into a Geodataframe
+#Only Istanbul's rows are decoded: the adm1_tr filter is passed down to the
+#file reader (see district_layer.py)
 
-tr_borders_level_2 = gpd.read_file(tr_borders_level_2_fp)
+from district_layer import read_province_districts, write_district_cache
+
+tr_borders_level_2 = read_province_districts(tr_borders_level_2_fp, "İSTANBUL")
 
 #Check shapefile crs
 
@@ -42,50 +46,25 @@ print(tr_borders_level_2.columns)
 #I guess that i can drop the following columns: adm_1, pcode, adm0_en,
 # adm0_tr, adm_0
 
-columns_to_drop = ["adm1", "pcode", "adm0_en", "adm0_tr", "adm_0"]
-tr_borders_level_2.drop(columns_to_drop, axis = 1, inplace = True)
-
 #Great, we see that we can filter istanbul by adm1_tr == "İstanbul"
 
-istanbul_mask = tr_borders_level_2.loc[:,"adm1_tr"] == "İSTANBUL"
-istanbul_districts = tr_borders_level_2.loc[istanbul_mask, :]
-
-# Do another level of drops
-
-columns_to_drop = ["adm1_tr", "adm1_en"]
-istanbul_districts.drop(columns_to_drop, axis = 1, inplace = True)
+#The drops, the filter, the renaming and the string formatting are shared with
+#the other provinces, see province_driver.py (prepare_provinces runs them for
+#all 81 provinces in parallel)
 
-#Rename columns
+from province_driver import extract_province_districts
 
-istanbul_districts.rename(columns = {"adm2_en" : "district_eng", "adm2_tr" : "district_tr"}, inplace = True)
+istanbul_districts = extract_province_districts(tr_borders_level_2, "İSTANBUL")
 
-# Fix string formatting
+#I also want to add a new column encoding which continent the district is on:
 
-istanbul_districts.loc[:,"district_eng"] = istanbul_districts.loc[:,"district_eng"].str.capitalize().str.strip()
-istanbul_districts.loc[:,"district_tr"] = istanbul_districts.loc[:,"district_tr"].str.capitalize().str.strip()
+#The continent is the side of the Bosphorus that holds most of the district's
+#area (see dividing_line.py). The hand-written district lists used to miss
+#Eyupsultan (listed as "Eyup") and Sultangazi.
 
-#I also want to add a new column encoding which continent the district is on:
+from dividing_line import side_of_polygons
 
-eur_districts = ["Arnavutkoy", "Avcilar", "Bagcilar",
-                 "Bahcelievler", "Bakirkoy", "Basaksehir",
-                 "Bayrampasa", "Besiktas", "Beylikduzu",
-                 "Beyoglu", "Buyukcekmece", "Catalca",
-                 "Esenler", "Esenyurt", "Eyup","Fatih",
-                 "Gaziosmanpasa", "Gungoren", "Kagithane",
-                 "Kucukcekmece", "Sariyer", "Silivri",
-                 "Sisli","Zeytinburnu"]
-
-anat_districts = ["Adalar", "Atasehir", "Beykoz",
-                  "Cekmekoy", "Kadikoy", "Kartal",
-                  "Maltepe","Pendik","Sancaktepe",
-                  "Sultanbeyli","Sile","Tuzla",
-                  "Umraniye", "Uskudar"]
-
-eur_district_mask = istanbul_districts.loc[:,"district_eng"].isin(eur_districts)
-anat_district_mask = istanbul_districts.loc[:,"district_eng"].isin(anat_districts)
-
-istanbul_districts.loc[eur_district_mask, "continent"] = "eur"
-istanbul_districts.loc[anat_district_mask, "continent"] = "anat"
+istanbul_districts.loc[:,"continent"] = side_of_polygons(istanbul_districts.geometry)
     
 
 #Save the shapefile
@@ -95,5 +74,13 @@ out_fp = "../../../Data/GIS data/Processed/istanbul_districts.shp"
 #Commented out to prevent accidental rewriting
 #istanbul_districts.to_file(out_fp, encoding = "utf-8")
 
+#The analysis scripts read the GeoParquet copy with load_districts(), rebuild it
+#whenever the shapefile is rewritten
+#write_district_cache(istanbul_districts, "../../../Data/GIS data/Processed/istanbul_districts.parquet")
+
+#and the simplified levels of detail that the maps are plotted with
+#from geometry_pyramid import build_geometry_pyramid, write_pyramid_cache
+#write_pyramid_cache(build_geometry_pyramid(istanbul_districts), "../../../Data/GIS data/Processed/istanbul_districts_pyramid.parquet")
+
 
 
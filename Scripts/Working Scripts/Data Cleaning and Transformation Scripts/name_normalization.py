@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:24:36 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module contains the place name index that every cleaner uses to turn a
+district name, however it is spelled, into its canonical Turkish and English
+names.
+
+The same district shows up in many spellings: "KADIKÖY" in the raw health
+data, "Kadikoy" in the airbnb data, "Kadiköy" in the district layer,
+"GAZÝOSMANPAÞA" (mojibake) next to "GAZİ OSMANPAŞA" (with a space) and so on.
+fold_name reduces all of them to the same key: the mojibake is repaired, the
+name is lower cased the Turkish way, the accents / dots are dropped and
+everything that is not a letter or a digit is removed.
+
+    "GAZÝOSMANPAÞA", "Gazi̇ osmanpaşa", "Gaziosmanpasa" -> "gaziosmanpasa"
+
+A NameIndex maps these keys to the canonical names with a dict, so a lookup
+is O(1). Each distinct value of a column is folded once and the result is
+mapped back onto the rows. Folded keys are cached, so onboarding thousands of
+neighborhood (mahalle) names stays fast too. There is no neighborhood
+reference layer in the data yet; when there is, it can be loaded into a
+NameIndex the same way.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from turkish_text_repair import MOJIBAKE_TABLE, TURKISH_LOWER_TABLE
+from health_schema import unique_districts_tr_corrected, unique_districts_eng_corrected
+from district_layer import load_districts
+import project_paths
+
+#%% --- Folding ---
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]")
+
+@lru_cache(maxsize = None)
+def fold_name(name):
+    """Reduce a place name to its lookup key.
+
+    Arguments:
+        name (str): A place name in any spelling.
+
+    Returns:
+        str: e.g. "kadikoy" for "KADIKÖY", "Kadıköy" or "Kadikoy".
+    """
+    folded = name.translate(MOJIBAKE_TABLE).translate(TURKISH_LOWER_TABLE).casefold()
+
+    #NFKD splits "ş" into "s" + a combining cedilla etc. The combining marks
+    #(and the stray dots of "i̇") are then dropped. "ı" has no decomposition.
+    folded = unicodedata.normalize("NFKD", folded)
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    folded = folded.replace("ı", "i")
+
+    return NON_ALPHANUMERIC.sub("", folded)
+
+#%% --- The index ---
+
+class NameIndex:
+    """Map place names in any spelling to canonical Turkish / English names."""
+
+    def __init__(self, names_tr = (), names_eng = ()):
+        self.names_tr = []
+        self.names_eng = []
+        self.positions = {}
+        for name_tr, name_eng in zip(names_tr, names_eng):
+            self.add_name(name_tr, name_eng)
+
+    def add_name(self, name_tr, name_eng):
+        """Add a canonical name pair and return its position."""
+        position = len(self.names_tr)
+        self.names_tr.append(name_tr)
+        self.names_eng.append(name_eng)
+        self.add_alias(name_tr, position)
+        self.add_alias(name_eng, position)
+        return position
+
+    def add_alias(self, name, position):
+        """Make another spelling point to the name at position.
+
+        The first name that claims a key keeps it.
+        """
+        self.positions.setdefault(fold_name(name), position)
+
+    def position_of(self, name):
+        return self.positions.get(fold_name(name), -1)
+
+    def lookup(self, values, language = "tr"):
+        """Map a column of names to their canonical names.
+
+        Arguments:
+            values (pandas.Series): Names in any spelling. NaN is kept.
+            language (str): "tr" or "eng", the canonical names to return.
+
+        Returns:
+            pandas.Series: The canonical names, NaN where a name is unknown.
+        """
+        canonical_names = self.names_tr if language == "tr" else self.names_eng
+
+        #Fold each distinct value once
+        mapping = {}
+        for value in values.dropna().unique():
+            position = self.position_of(value)
+            if position != -1:
+                mapping[value] = canonical_names[position]
+
+        return values.map(mapping)
+
+    def to_tr(self, values):
+        return self.lookup(values, "tr")
+
+    def to_eng(self, values):
+        return self.lookup(values, "eng")
+
+#%% --- District indexes ---
+
+def build_district_index(layer_tr, layer_eng, canonical_tr = None, canonical_eng = None):
+    """Build a district index from the names of a district layer.
+
+    Arguments:
+        layer_tr (iterable): Turkish district names of the layer (district_t).
+        layer_eng (iterable): English district names of the layer (district_e).
+        canonical_tr (list): Optional hand-checked Turkish spellings. When
+            given, these are the names the index returns and the layer's
+            spellings become aliases of them.
+        canonical_eng (list): Optional hand-checked English spellings.
+
+    Returns:
+        NameIndex: The district index.
+    """
+    district_index = NameIndex(canonical_tr or (), canonical_eng or ())
+
+    for name_tr, name_eng in zip(layer_tr, layer_eng):
+        #Drop the combining dots that str.capitalize() left in some layers
+        name_tr = name_tr.replace("\u0307", "")
+
+        position = district_index.position_of(name_eng)
+        if position == -1:
+            position = district_index.position_of(name_tr)
+        if position == -1:
+            position = district_index.add_name(name_tr, name_eng)
+
+        district_index.add_alias(name_tr, position)
+        district_index.add_alias(name_eng, position)
+
+    return district_index
+
+
+@lru_cache(maxsize = None)
+def istanbul_district_index(districts_fp = project_paths.istanbul_districts_parquet_fp):
+    """The Istanbul district index, shared by the health cleaner, the airbnb
+    cleaner and the shapefile script.
+
+    Built from the district_t / district_e attributes of the district layer.
+    The canonical names are the corrected lists of health_schema.py, so the
+    cleaned data keeps its spelling ("Gaziosmanpaşa", "Avcılar").
+
+    Arguments:
+        districts_fp (str): Filepath of the GeoParquet cache of the Istanbul
+            district layer.
+
+    Returns:
+        NameIndex: The district index.
+    """
+    districts = load_districts(["district_t", "district_e"], parquet_fp = districts_fp)
+    district_index = build_district_index(districts.loc[:,"district_t"],
+                                          districts.loc[:,"district_e"],
+                                          unique_districts_tr_corrected,
+                                          unique_districts_eng_corrected)
+
+    #Eyüp was renamed to Eyüpsultan in 2017, older datasets still use the old name
+    district_index.add_alias("Eyüp", district_index.position_of("Eyüpsultan"))
+    return district_index
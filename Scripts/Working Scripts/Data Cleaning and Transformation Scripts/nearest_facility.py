@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:47:15 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module answers nearest-facility questions over the cleaned health
+services data: "which hospital is closest to each of these points and how far
+is it?", "how many low level care centers are within 2 km?".
+
+The facilities go into a KD-tree (scipy.spatial.cKDTree). The tree is built on
+the 3D coordinates of the points on a unit sphere, not on latitude /
+longitude: the straight line (chord) between two points on the sphere grows
+with the great circle distance between them, so the nearest point by chord
+is also the nearest point by haversine distance, with no projection error.
+The chord is then turned into metres:
+
+    distance = 2 * R * arcsin(chord / 2)
+
+which is the haversine distance of geodistance.py. The tree answers a million queries in about
+a second, on all cores.
+
+A FacilityIndex keeps one tree per filter (e.g. private hospitals), each
+built the first time it is asked for.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geodistance import unit_sphere_xyz, chord_to_metres, metres_to_chord
+from healthservices_columnar_store import load_health
+
+#%% --- The index ---
+
+#The columns a FacilityIndex can be filtered by
+facility_filter_columns = ["institution_type_eng", "care_type", "private_or_public"]
+
+class FacilityIndex:
+    """Nearest-facility and within-radius queries over the health facilities.
+
+    Filters are keyword arguments: a value or a list of values of
+    institution_type_eng, care_type or private_or_public, e.g.
+
+        facility_index.nearest(lon, lat, institution_type_eng = "Hospital",
+                               private_or_public = "Public")
+    """
+
+    def __init__(self, facilities = None):
+        """
+        Arguments:
+            facilities (pandas.DataFrame): The facilities, with institution_id,
+                latitude, longitude and the filter columns. None loads the
+                cleaned health services data. Rows without coordinates are
+                left out.
+        """
+        if facilities is None:
+            facilities = load_health(columns = ["institution_id", "latitude", "longitude"]
+                                     + facility_filter_columns)
+
+        has_coordinates = facilities.loc[:,"latitude"].notna() & facilities.loc[:,"longitude"].notna()
+        self.facilities = facilities.loc[has_coordinates,:].reset_index(drop = True)
+        self.xyz = unit_sphere_xyz(self.facilities.loc[:,"longitude"], self.facilities.loc[:,"latitude"])
+        self.institution_ids = self.facilities.loc[:,"institution_id"].to_numpy()
+        self.trees = {}
+
+    def subset(self, **filters):
+        """The tree of the facilities that pass the filters.
+
+        Returns:
+            tuple: (cKDTree, positions of its facilities in self.facilities)
+        """
+        unknown_columns = set(filters) - set(facility_filter_columns)
+        if unknown_columns:
+            raise ValueError("Can not filter facilities by {}".format(sorted(unknown_columns)))
+
+        #A filter value can be a single value or a list of values
+        filters = {column: (value,) if isinstance(value, str) else tuple(value)
+                   for column, value in filters.items() if value is not None}
+        key = tuple(sorted(filters.items()))
+
+        if key not in self.trees:
+            mask = np.ones(len(self.facilities), dtype = bool)
+            for column, values in filters.items():
+                mask &= self.facilities.loc[:,column].isin(values).to_numpy()
+            positions = np.flatnonzero(mask)
+            if not len(positions):
+                raise ValueError("No facility passes the filters {}".format(filters))
+            self.trees[key] = (cKDTree(self.xyz[positions]), positions)
+
+        return self.trees[key]
+
+    def nearest(self, longitude, latitude, k = 1, **filters):
+        """Find the k nearest facilities of each query point.
+
+        Arguments:
+            longitude (array-like): x coordinates of the query points.
+            latitude (array-like): y coordinates of the query points.
+            k (int): Number of facilities to return per point.
+            **filters: See the class docstring.
+
+        Returns:
+            tuple: (distances in metres, institution_ids), both (n, k) arrays,
+                nearest first. Query points with a missing coordinate get
+                NaN distances and -1 ids, the same as when there are fewer
+                than k facilities.
+        """
+        tree, positions = self.subset(**filters)
+        query_xyz = unit_sphere_xyz(longitude, latitude)
+        valid = ~np.isnan(query_xyz).any(axis = 1)
+
+        distances = np.full((len(query_xyz), k), np.nan)
+        institution_ids = np.full((len(query_xyz), k), -1, dtype = "int64")
+
+        chords, tree_positions = tree.query(query_xyz[valid], k = k, workers = -1)
+        chords = chords.reshape(-1, k)
+        tree_positions = tree_positions.reshape(-1, k)
+
+        #cKDTree marks the missing neighbours with an infinite distance
+        found = np.isfinite(chords)
+        valid_distances = np.where(found, chord_to_metres(np.where(found, chords, 0.0)), np.nan)
+        valid_ids = np.where(found, self.institution_ids[positions[np.minimum(tree_positions, len(positions) - 1)]], -1)
+
+        distances[valid] = valid_distances
+        institution_ids[valid] = valid_ids
+        return distances, institution_ids
+
+    def within(self, longitude, latitude, radius_m, count_only = False, **filters):
+        """Find the facilities within a radius of each query point.
+
+        Arguments:
+            longitude (array-like): x coordinates of the query points.
+            latitude (array-like): y coordinates of the query points.
+            radius_m (float): The radius, in metres.
+            count_only (bool): Only count the facilities.
+            **filters: See the class docstring.
+
+        Returns:
+            numpy.ndarray: The number of facilities of each point, or an
+                object array with the institution_ids of each point.
+        """
+        tree, positions = self.subset(**filters)
+        query_xyz = unit_sphere_xyz(longitude, latitude)
+        valid = ~np.isnan(query_xyz).any(axis = 1)
+        radius = metres_to_chord(radius_m)
+
+        if count_only:
+            counts = np.zeros(len(query_xyz), dtype = "int64")
+            counts[valid] = tree.query_ball_point(query_xyz[valid], radius,
+                                                  workers = -1, return_length = True)
+            return counts
+
+        neighbours = np.empty(len(query_xyz), dtype = object)
+        found = iter(tree.query_ball_point(query_xyz[valid], radius, workers = -1))
+        for i, is_valid in enumerate(valid):
+            tree_positions = next(found) if is_valid else []
+            neighbours[i] = self.institution_ids[positions[np.asarray(tree_positions, dtype = "int64")]]
+        return neighbours
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:15 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module holds the filepaths of the project's datasets so that the
+cleaning pipeline and the helper modules do not depend on the folder they
+are run from. The paths are built from the location of this file.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+
+#%% --- Folders ---
+
+#Scripts/Working Scripts/Data Cleaning and Transformation Scripts -> project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+non_gis_data_dir = os.path.join(project_root, "Data", "Non-GIS data")
+gis_data_dir = os.path.join(project_root, "Data", "GIS data")
+processed_gis_dir = os.path.join(gis_data_dir, "Processed")
+
+#%% --- Datasets ---
+
+#Istanbul health services data
+health_raw_fp = os.path.join(non_gis_data_dir, "raw", "istanbul_healthservices.csv")
+health_cleaned_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_healthservices_cleaned.csv")
+health_parquet_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_healthservices_cleaned.parquet")
+
+#State of the incremental cleaner: raw row hashes and the log of changes
+health_row_hashes_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_healthservices_row_hashes.parquet")
+health_changelog_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_healthservices_changelog.csv")
+
+#Population and income of the Istanbul districts
+district_income_fp = os.path.join(non_gis_data_dir, "external", "district_income.xlsx")
+
+#Administrative borders of Turkey: provinces (adm1) and districts (adm2)
+adm_borders_dir = os.path.join(gis_data_dir, "Raw", "Turkey_administrative_borders")
+adm1_fp = os.path.join(adm_borders_dir, "tur_polbnda_adm1.shp")
+adm2_fp = os.path.join(adm_borders_dir, "tur_polbnda_adm2.shp")
+
+#Istanbul districts layer, made by the Istanbul shapefile script
+istanbul_districts_fp = os.path.join(processed_gis_dir, "istanbul_districts.shp")
+#and its GeoParquet cache, which the analysis scripts read
+istanbul_districts_parquet_fp = os.path.join(processed_gis_dir, "istanbul_districts.parquet")
+#and its simplified levels of detail, see geometry_pyramid.py
+istanbul_districts_pyramid_fp = os.path.join(processed_gis_dir, "istanbul_districts_pyramid.parquet")
+
+#Distance to the nearest facility rasters (one per care type) and their
+#district summaries, made by accessibility_surface.py
+accessibility_dir = os.path.join(processed_gis_dir, "Accessibility")
+accessibility_summary_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_accessibility_by_district.csv")
+
+#Correlations of the institution counts with the district covariates, made
+#by district_correlations.py
+district_correlations_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_district_correlations.csv")
+#The same, by care type
+care_type_correlations_fp = os.path.join(non_gis_data_dir, "cleaned", "istanbul_district_care_type_correlations.csv")
+
+#Voronoi service areas of the facilities, made by service_areas.py
+service_areas_fp = os.path.join(processed_gis_dir, "istanbul_service_areas.parquet")
+
+#On-disk cache of the data access layer (data_access.py). Its files are
+#named after hashes of their sources and can be deleted at any time.
+data_cache_dir = os.path.join(project_root, "Data", "cache")
+#and the typed copy of district_income.xlsx in it
+district_income_cache_fp = os.path.join(data_cache_dir, "district_income.parquet")
+
+#%% --- Per province datasets ---
+
+def province_paths(province_slug):
+    """Filepaths of one province's datasets.
+
+    The names follow the Istanbul files, e.g. province_paths("istanbul")
+    gives health_raw_fp, health_cleaned_fp and health_parquet_fp above.
+
+    Arguments:
+        province_slug (str): Lower case ascii province name, e.g. "izmir".
+
+    Returns:
+        dict: raw, cleaned, parquet, districts and districts_parquet filepaths.
+    """
+    return {"raw": os.path.join(non_gis_data_dir, "raw", province_slug + "_healthservices.csv"),
+            "cleaned": os.path.join(non_gis_data_dir, "cleaned", province_slug + "_healthservices_cleaned.csv"),
+            "parquet": os.path.join(non_gis_data_dir, "cleaned", province_slug + "_healthservices_cleaned.parquet"),
+            "districts": os.path.join(processed_gis_dir, province_slug + "_districts.shp"),
+            "districts_parquet": os.path.join(processed_gis_dir, province_slug + "_districts.parquet")}
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:47:52 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module runs the health services cleaning and the district extraction
+for any (or all) of Turkey's 81 provinces, one province per worker process.
+
+For every province it:
+    - Cuts the province's districts out of tur_polbnda_adm2 and writes them
+    to Data/GIS data/Processed/<province>_districts.shp (and its GeoParquet
+    cache), the same way the Istanbul shapefile script does for Istanbul.
+    - If Data/Non-GIS data/raw/<province>_healthservices.csv exists, runs it
+    through the cleaning pipeline and writes the cleaned csv and its Parquet
+    copy. The raw district names are matched to the adm2 district names with
+    the name index of name_normalization.py, so no district list has to be
+    typed by hand.
+
+Istanbul keeps its hand-corrected district names from health_schema.py so
+that its cleaned data stays the same. Its district layer is not written
+here: istanbul_districts.shp comes from the Istanbul shapefile script, with
+the continent column and the geometry pyramid (geometry_pyramid.py) that
+the analysis needs.
+
+The provinces do not depend on each other, so a nationwide refresh runs on as
+many cores as there are.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import pandas as pd
+import geopandas as gpd
+
+from turkish_text_repair import turkish_capitalize
+from name_normalization import build_district_index
+from district_layer import read_province_districts, write_district_cache
+from district_assignment import DistrictLocator, locate_districts
+from dividing_line import tag_continent
+from health_schema import (health_category_dtypes,
+                           unique_districts_tr_corrected,
+                           unique_districts_eng_corrected)
+from healthservices_cleaning_pipeline import (cleaning_stages,
+                                              map_districts,
+                                              clean_health_services)
+import project_paths
+
+#%% --- District names ---
+
+def province_slug(province_en):
+    #"ISTANBUL" -> "istanbul", used in the filenames
+    return province_en.strip().lower().replace(" ", "_")
+
+
+def province_district_index(province_tr, adm2_province):
+    """Build the district name index of a province from its adm2 rows.
+
+    Arguments:
+        province_tr (str): adm1_tr of the province.
+        adm2_province (pandas.DataFrame): The adm2 rows of the province, with
+            the original upper case adm2_tr / adm2_en columns.
+
+    Returns:
+        name_normalization.NameIndex: The district index. The raw health
+            data's spellings ("ÞÝÞLÝ", "GAZÝOSMANPAÞA") fold to the same keys.
+    """
+    names_tr = [turkish_capitalize(name.strip()) for name in adm2_province.loc[:,"adm2_tr"]]
+    names_eng = [name.strip().capitalize() for name in adm2_province.loc[:,"adm2_en"]]
+
+    #Istanbul keeps its hand-corrected spellings
+    if province_tr == "İSTANBUL":
+        return build_district_index(names_tr, names_eng,
+                                    unique_districts_tr_corrected,
+                                    unique_districts_eng_corrected)
+
+    return build_district_index(names_tr, names_eng)
+
+#%% --- District extraction ---
+
+#Columns of tur_polbnda_adm2 that are not needed in a district layer
+adm2_columns_to_drop = ["adm1", "pcode", "adm0_en", "adm0_tr", "adm_0",
+                        "adm1_tr", "adm1_en"]
+
+def extract_province_districts(adm2, province_tr, district_index = None):
+    """Cut the districts of a province out of the adm2 borders.
+
+    Arguments:
+        adm2 (geopandas.GeoDataFrame): tur_polbnda_adm2, or a part of it.
+        province_tr (str): adm1_tr of the province, e.g. "İSTANBUL".
+        district_index (name_normalization.NameIndex): The district names to
+            use. None builds it from the adm2 rows.
+
+    Returns:
+        geopandas.GeoDataFrame: The districts with district_eng and
+            district_tr columns.
+    """
+    province_mask = adm2.loc[:,"adm1_tr"] == province_tr
+    districts = adm2.loc[province_mask,:]
+    district_index = district_index or province_district_index(province_tr, districts)
+
+    districts = districts.drop(columns = adm2_columns_to_drop, errors = "ignore")
+    districts = districts.rename(columns = {"adm2_en" : "district_eng", "adm2_tr" : "district_tr"})
+
+    # Fix string formatting
+    #The canonical names of the index are used, str.capitalize() would turn
+    #"ŞİŞLİ" into "Şi̇şli̇" (with combining dots)
+    districts.loc[:,"district_eng"] = district_index.to_eng(districts.loc[:,"district_eng"])
+    districts.loc[:,"district_tr"] = district_index.to_tr(districts.loc[:,"district_tr"])
+
+    return districts
+
+#%% --- One province ---
+
+def prepare_province(province_tr, province_en, adm2_province, chunksize = 50000, write_districts = True):
+    """Extract the districts and clean the health data of a single province.
+
+    This is what each worker process runs.
+
+    Arguments:
+        province_tr (str): adm1_tr of the province.
+        province_en (str): adm1_en of the province.
+        adm2_province (geopandas.GeoDataFrame): The adm2 rows of the province.
+        chunksize (int): Number of raw rows per cleaning chunk.
+        write_districts (bool): Write the district layer. Never done for
+            Istanbul.
+
+    Returns:
+        dict: A summary of what was written.
+    """
+    paths = project_paths.province_paths(province_slug(province_en))
+    summary = {"province": province_tr, "n_districts": len(adm2_province),
+               "n_institutions": None, "districts_fp": None, "cleaned_fp": None, "skipped": None}
+
+    district_index = province_district_index(province_tr, adm2_province)
+
+    districts = extract_province_districts(adm2_province, province_tr, district_index)
+
+    #The Istanbul layer belongs to the Istanbul shapefile script
+    if write_districts and province_tr != "İSTANBUL":
+        districts.to_file(paths["districts"], encoding = "utf-8")
+        write_district_cache(districts, paths["districts_parquet"])
+        summary["districts_fp"] = paths["districts"]
+
+    if os.path.exists(paths["raw"]):
+        #The province's own district names and polygons replace Istanbul's
+        province_stages = {map_districts: partial(map_districts, district_index = district_index),
+                           locate_districts: partial(locate_districts,
+                                                     locator = DistrictLocator(districts.geometry.to_numpy(),
+                                                                               districts.loc[:,"district_tr"].to_numpy()))}
+        stages = [province_stages.get(stage, stage) for stage in cleaning_stages]
+
+        #The Bosphorus only divides Istanbul, the other provinces get no continent
+        if province_tr != "İSTANBUL":
+            stages.remove(tag_continent)
+
+        district_tr_dtype = pd.CategoricalDtype(sorted(set(district_index.names_tr)))
+        category_dtypes = dict(health_category_dtypes,
+                               district_tr = district_tr_dtype,
+                               district_eng = pd.CategoricalDtype(sorted(set(district_index.names_eng))),
+                               district_from_geometry = district_tr_dtype)
+
+        summary["n_institutions"] = clean_health_services(paths["raw"],
+                                                          paths["cleaned"],
+                                                          paths["parquet"],
+                                                          chunksize,
+                                                          stages,
+                                                          category_dtypes)
+        summary["cleaned_fp"] = paths["cleaned"]
+
+    return summary
+
+#%% --- All provinces ---
+
+def prepare_provinces(provinces = None,
+                      adm1_fp = project_paths.adm1_fp,
+                      adm2_fp = project_paths.adm2_fp,
+                      max_workers = None,
+                      chunksize = 50000,
+                      write_districts = True):
+    """Run prepare_province for several provinces in parallel.
+
+    Arguments:
+        provinces (list): adm1_tr or adm1_en names, e.g. ["İSTANBUL", "IZMIR"].
+            None runs all 81 provinces.
+        adm1_fp (str): Filepath of the province borders. Only its attribute
+            table is read.
+        adm2_fp (str): Filepath of the district borders.
+        max_workers (int): Number of worker processes. None uses every core.
+        chunksize (int): Number of raw rows per cleaning chunk.
+        write_districts (bool): Write the district layers (not Istanbul's).
+
+    Returns:
+        pandas.DataFrame: One summary row per province. A province without
+            adm2 rows is not run; its skipped column says why.
+
+    Raises:
+        ValueError: When some of the provinces match no adm1_tr or adm1_en.
+    """
+    province_names = gpd.read_file(adm1_fp, ignore_geometry = True).loc[:,["adm1_tr", "adm1_en"]]
+    if provinces is not None:
+        known = set(province_names.loc[:,"adm1_tr"]) | set(province_names.loc[:,"adm1_en"])
+        unknown = [province for province in provinces if province not in known]
+        if unknown:
+            raise ValueError("Unknown provinces {}, use the adm1_tr or adm1_en names".format(unknown))
+
+        province_mask = (province_names.loc[:,"adm1_tr"].isin(provinces)
+                         | province_names.loc[:,"adm1_en"].isin(provinces))
+        province_names = province_names.loc[province_mask,:]
+
+    #The adm2 file is read once, each worker only gets its own province.
+    #When only a few provinces are asked for, the others are never decoded.
+    adm2 = read_province_districts(adm2_fp,
+                                   None if provinces is None else list(province_names.loc[:,"adm1_tr"]))
+    adm2_per_province = dict(tuple(adm2.groupby("adm1_tr")))
+
+    #A province whose adm1_tr is spelled differently in the adm2 file has no
+    #districts to work with: report it instead of stopping the whole run
+    has_districts = province_names.loc[:,"adm1_tr"].isin(adm2_per_province)
+    summaries = [{"province": province_tr, "n_districts": 0, "n_institutions": None,
+                  "districts_fp": None, "cleaned_fp": None, "skipped": "no adm2 rows for this adm1_tr"}
+                 for province_tr in province_names.loc[~has_districts,"adm1_tr"]]
+    province_names = province_names.loc[has_districts,:]
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        futures = [executor.submit(prepare_province,
+                                   province_tr,
+                                   province_en,
+                                   adm2_per_province[province_tr],
+                                   chunksize,
+                                   write_districts)
+                   for province_tr, province_en in zip(province_names.loc[:,"adm1_tr"],
+                                                       province_names.loc[:,"adm1_en"])]
+
+        for future in as_completed(futures):
+            summaries.append(future.result())
+
+    return pd.DataFrame(summaries).sort_values("province").reset_index(drop = True)
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #print(prepare_provinces())
+    pass
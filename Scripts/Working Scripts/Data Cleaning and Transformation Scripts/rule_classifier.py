@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:52:07 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module contains the rule engine that tags and harmonizes the
+institutions of the health services data.
+
+The rules live in institution_classification_rules.csv, one rule per row:
+
+    rule_name       A unique name. It becomes the name of a regex group, so
+                    it has to be a valid python identifier.
+    source_column   The column the pattern is searched in.
+    pattern         A regular expression.
+    rewrite_scope   Empty: the source value is left alone.
+                    "match": the matched text is replaced with rewrite.
+                    "value": the whole source value is replaced with rewrite.
+    rewrite         The replacement text. Empty means remove.
+    tag_column      The column that gets tagged when the pattern matches.
+    tag_value       The tag for the rows that match.
+    tag_default     The tag for the rows that match none of the rules of
+                    this tag column.
+
+All the rules of a source column are compiled into ONE regex with a named
+group per rule. A single scan of a value finds every rule that matches it,
+so adding a rule does not add another pass over the data. Each distinct value
+is scanned once and the result is mapped back onto the rows.
+
+When two patterns could match at the same place, the one higher up in the
+file wins. Put longer patterns before their prefixes (e.g. "Devlet Hastanesi"
+before "Devlet").
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import os
+import re
+
+import pandas as pd
+
+#%% --- Reading and compiling the rules ---
+
+rules_fp = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "institution_classification_rules.csv")
+
+def read_rules(fp = rules_fp):
+    """Read a rule file.
+
+    Arguments:
+        fp (str): Filepath of the rule csv.
+
+    Returns:
+        pandas.DataFrame: The rules, indexed by rule_name, in file order.
+    """
+    rules = pd.read_csv(fp, index_col = "rule_name", dtype = str, encoding = "utf-8")
+
+    invalid_names = [name for name in rules.index if not name.isidentifier()]
+    if invalid_names or rules.index.has_duplicates:
+        raise ValueError("Rule names must be unique python identifiers: {}".format(invalid_names))
+
+    return rules
+
+
+def compile_rules(rules):
+    """Compile the rules of every source column into one regex.
+
+    Arguments:
+        rules (pandas.DataFrame): Rules, as returned by read_rules.
+
+    Returns:
+        dict: source column -> (compiled regex, the rules of that column).
+    """
+    compiled_rules = {}
+    for source_column, column_rules in rules.groupby("source_column", sort = False):
+        combined_pattern = "|".join("(?P<{}>{})".format(rule_name, pattern)
+                                    for rule_name, pattern in column_rules.loc[:,"pattern"].items())
+        compiled_rules[source_column] = (re.compile(combined_pattern), column_rules)
+
+    return compiled_rules
+
+#%% --- Applying the rules ---
+
+def classify_value(value, regex, column_rules):
+    """Scan a single value once and apply every rule that matches it.
+
+    Arguments:
+        value (str): The value to classify.
+        regex (re.Pattern): The combined regex of the value's column.
+        column_rules (pandas.DataFrame): The rules of the value's column.
+
+    Returns:
+        tuple: (the rewritten value, {tag column: tag} of the matching rules)
+    """
+    tags = {}
+    value_rewrite = None
+
+    def rewrite_match(match):
+        nonlocal value_rewrite
+        rule = column_rules.loc[match.lastgroup,:]
+
+        if pd.notna(rule.loc["tag_column"]):
+            tags[rule.loc["tag_column"]] = rule.loc["tag_value"]
+
+        rewrite = rule.loc["rewrite"] if pd.notna(rule.loc["rewrite"]) else ""
+        if rule.loc["rewrite_scope"] == "match":
+            return rewrite
+        if rule.loc["rewrite_scope"] == "value":
+            value_rewrite = rewrite
+        return match.group()
+
+    rewritten_value = regex.sub(rewrite_match, value).strip()
+    if value_rewrite is not None:
+        rewritten_value = value_rewrite
+
+    return rewritten_value, tags
+
+
+def apply_rules(chunk, compiled_rules, row_masks = None):
+    """Apply the compiled rules to a chunk.
+
+    Arguments:
+        chunk (pandas.DataFrame): The chunk to classify. It is modified in place.
+        compiled_rules (dict): As returned by compile_rules.
+        row_masks (dict): Optional source column -> boolean mask. The rules of
+            that column are only applied to the rows of the mask.
+
+    Returns:
+        pandas.DataFrame: The same chunk, for chaining.
+    """
+    row_masks = row_masks or {}
+
+    for source_column, (regex, column_rules) in compiled_rules.items():
+        row_mask = row_masks.get(source_column, pd.Series(True, index = chunk.index))
+        source_values = chunk.loc[row_mask, source_column]
+
+        #Scan each distinct value once
+        results = {value: classify_value(value, regex, column_rules)
+                   for value in source_values.dropna().unique()}
+
+        if column_rules.loc[:,"rewrite_scope"].notna().any():
+            rewritten = source_values.map({value: result[0] for value, result in results.items()})
+            chunk.loc[row_mask, source_column] = rewritten
+
+        tag_columns = column_rules.loc[:,"tag_column"].dropna().unique()
+        for tag_column in tag_columns:
+            tag_default = column_rules.loc[column_rules.loc[:,"tag_column"] == tag_column, "tag_default"].dropna()
+            tag_default = tag_default.iloc[0] if len(tag_default) else None
+
+            tag_map = {value: result[1][tag_column]
+                       for value, result in results.items() if tag_column in result[1]}
+            tags = source_values.map(tag_map)
+            if tag_default is not None:
+                tags = tags.fillna(tag_default)
+            chunk.loc[row_mask, tag_column] = tags
+
+    return chunk
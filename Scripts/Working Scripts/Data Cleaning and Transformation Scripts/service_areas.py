@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:34:09 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module builds the Voronoi (Thiessen) service areas of the facilities:
+for each institution type, every facility gets the part of Istanbul that is
+closer to it than to any other facility of the same type.
+
+A service area that is large, or that holds many people, marks a part of the
+city that the facility type serves poorly. Running it over all the
+institution types at once shows where each type is missing.
+
+How it works:
+    - The facilities are projected to UTM zone 35N (the metric crs of
+    analysis_grid.py), so the cells are drawn with straight distances
+    in metres.
+    - The cells of one institution type come from a single
+    shapely.voronoi_polygons call (GEOS builds them from the Delaunay
+    triangulation of the points). The cells are returned in the order of the
+    points.
+    - The district polygons are cut into 2 km pieces (as in
+    district_assignment.py). The cells of all the types are paired with the
+    pieces they overlap through an STRtree and the overlaps are cut in one
+    vectorized shapely.intersection call. Cutting against the whole coastline
+    instead takes about ten times longer.
+    - The area of a cell is the sum of its overlaps, and its population is
+    interpolated by area: each overlap gets its share of the population of
+    its district.
+    - Cells that cross the province border become the union of their
+    overlaps (one coverage_union_all call over all of them). Cells inside
+    the province are kept as they are.
+
+Facilities of the same type at the same coordinates share one cell; its area
+and population are split between them. A type with a single facility gets
+the whole province.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+from district_layer import load_districts
+from healthservices_columnar_store import load_health
+from district_assignment import grid_pieces
+from analysis_grid import accessibility_crs
+from data_access import district_covariates
+import project_paths
+
+#%% --- Voronoi cells ---
+
+def voronoi_cells(x, y, extent):
+    """The Voronoi cell of each point, unclipped.
+
+    Arguments:
+        x, y (numpy.ndarray): Projected coordinates of the points.
+        extent (shapely.Geometry): The cells reach at least this far.
+
+    Returns:
+        numpy.ndarray: One polygon per point. Points at the same coordinates
+            get the same polygon.
+    """
+    unique_xy, positions = np.unique(np.column_stack([x, y]), axis = 0, return_inverse = True)
+    positions = positions.ravel()
+
+    if len(unique_xy) == 1:
+        return np.repeat(extent.envelope, len(x))
+
+    cells = shapely.voronoi_polygons(shapely.multipoints(unique_xy), extend_to = extent, ordered = True)
+    return shapely.get_parts(cells)[positions]
+
+
+def union_by_group(geometries, groups, selected):
+    """Union the polygons of each selected group, in one vectorized call.
+
+    The polygons of a group must not overlap (they are cut from a coverage).
+
+    Arguments:
+        geometries (numpy.ndarray): The polygons, sorted by group.
+        groups (numpy.ndarray): The group of each polygon (0 to n - 1).
+        selected (numpy.ndarray): Boolean mask of the n groups to union.
+
+    Returns:
+        numpy.ndarray: The union of each selected group.
+    """
+    #Only the polygonal parts: pieces that just touch a cell leave lines and points
+    parts, part_positions = shapely.get_parts(geometries, return_index = True)
+    polygonal = shapely.get_type_id(parts) == 3
+    parts, part_groups = parts[polygonal], groups[part_positions[polygonal]]
+    keep = selected[part_groups]
+    parts, part_groups = parts[keep], part_groups[keep]
+
+    #One row per group, padded with None
+    rows = np.cumsum(selected) - 1
+    starts = np.searchsorted(part_groups, part_groups)
+    table = np.full((selected.sum(), np.bincount(part_groups).max() if len(parts) else 1), None, dtype = object)
+    table[rows[part_groups], np.arange(len(parts)) - starts] = parts
+
+    return shapely.coverage_union_all(table, axis = 1)
+
+
+def build_service_areas(facilities = None, districts = None, district_population = None,
+                        crs = accessibility_crs, piece_size = 2000):
+    """Build the service areas of the facilities, per institution type.
+
+    Arguments:
+        facilities (pandas.DataFrame): institution_id, institution_type_eng,
+            latitude and longitude. None loads the cleaned health services
+            data. Rows without coordinates are left out.
+        districts (geopandas.GeoDataFrame): The district layer, with
+            district_e. None loads the Istanbul districts.
+        district_population (pandas.Series): Population, indexed by
+            district_e. None reads district_income.xlsx.
+        crs (str): Metric crs the areas are measured in.
+        piece_size (float): Size of the grid cells the districts are cut into
+            for the clipping, in metres.
+
+    Returns:
+        geopandas.GeoDataFrame: One row per facility with institution_id,
+            institution_type_eng, service_area_km2, population and the clipped
+            cell (in crs).
+    """
+    if facilities is None:
+        facilities = load_health(columns = ["institution_id", "institution_type_eng", "latitude", "longitude"])
+    if districts is None:
+        districts = load_districts(["district_e"])
+    if district_population is None:
+        district_population = district_covariates().set_index("district_eng").loc[:,"population"]
+
+    has_coordinates = facilities.loc[:,"latitude"].notna() & facilities.loc[:,"longitude"].notna()
+    facilities = gpd.GeoDataFrame(facilities.loc[has_coordinates,:].reset_index(drop = True),
+                                  geometry = gpd.points_from_xy(facilities.loc[has_coordinates,"longitude"],
+                                                                facilities.loc[has_coordinates,"latitude"]),
+                                  crs = "EPSG:4326").to_crs(crs)
+    districts = districts.to_crs(crs)
+    extent = shapely.box(*districts.total_bounds)
+
+    #One voronoi_polygons call per institution type
+    x = facilities.geometry.x.to_numpy()
+    y = facilities.geometry.y.to_numpy()
+    cells = np.empty(len(facilities), dtype = object)
+    for _, positions in facilities.groupby("institution_type_eng", observed = True).indices.items():
+        cells[positions] = voronoi_cells(x[positions], y[positions], extent)
+
+    #Cut the districts into small pieces, pair each cell with the pieces it
+    #overlaps and cut the overlaps, all in vectorized calls. A piece that is
+    #inside its cell needs no cutting.
+    district_positions, pieces = grid_pieces(districts.geometry.to_numpy(), piece_size)
+    cell_positions, piece_positions = shapely.STRtree(pieces).query(cells, predicate = "intersects")
+    shapely.prepare(cells)
+    inside = shapely.contains_properly(cells[cell_positions], pieces[piece_positions])
+    overlaps = pieces[piece_positions].copy()
+    overlaps[~inside] = shapely.intersection(cells[cell_positions[~inside]], pieces[piece_positions[~inside]])
+
+    #Areal interpolation of the district populations
+    district_density = (districts.loc[:,"district_e"].map(district_population).to_numpy(dtype = "float64")
+                        / shapely.area(districts.geometry.to_numpy()))
+    overlap_area = shapely.area(overlaps)
+    area = np.bincount(cell_positions, weights = overlap_area, minlength = len(cells))
+    population = np.bincount(cell_positions,
+                             weights = np.nan_to_num(overlap_area * district_density[district_positions[piece_positions]]),
+                             minlength = len(cells))
+
+    #Clip the cells: the ones inside the province stay as they are, the
+    #others are the union of their overlaps
+    province = shapely.union_all(districts.geometry.to_numpy())
+    shapely.prepare(province)
+    cells = cells.copy()
+    boundary = ~shapely.contains_properly(province, cells)
+    cells[boundary] = union_by_group(overlaps, cell_positions, boundary)
+
+    #Facilities at the same coordinates share their cell
+    same_cell = (facilities.groupby(["institution_type_eng", "latitude", "longitude"], observed = True)
+                 ["institution_id"].transform("size").to_numpy())
+
+    service_areas = gpd.GeoDataFrame({"institution_id": facilities.loc[:,"institution_id"],
+                                      "institution_type_eng": facilities.loc[:,"institution_type_eng"],
+                                      "service_area_km2": area / 1e6 / same_cell,
+                                      "population": population / same_cell},
+                                     geometry = cells,
+                                     crs = crs)
+    return service_areas
+
+
+def summarize_service_areas(service_areas):
+    """Per institution type: number of facilities, the median and the largest
+    service area and population of a facility."""
+    return (service_areas.groupby("institution_type_eng", observed = True)
+            .agg(n_facilities = ("institution_id", "size"),
+                 median_area_km2 = ("service_area_km2", "median"),
+                 max_area_km2 = ("service_area_km2", "max"),
+                 median_population = ("population", "median"),
+                 max_population = ("population", "max"))
+            .reset_index())
+
+
+def write_service_areas(service_areas_fp = project_paths.service_areas_fp, **kwargs):
+    """Build the service areas of the cleaned data and write them as GeoParquet.
+
+    Arguments:
+        service_areas_fp (str): Filepath of the output.
+        **kwargs: Passed on to build_service_areas.
+    """
+    build_service_areas(**kwargs).to_parquet(service_areas_fp)
+
+
+if __name__ == "__main__":
+    #Commented out to prevent accidental re-writing
+    #write_service_areas()
+    pass
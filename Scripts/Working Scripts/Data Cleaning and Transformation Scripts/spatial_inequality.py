@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 03:05:41 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module measures how unevenly the institutions of each type are spread
+over the districts, compared to where the people live.
+
+Every measure is population-weighted. A district's share of the population
+(s) is set against its share of the institutions of a type (q):
+    - Lorenz curve: the districts sorted by institutions per person, the
+    cumulative share of the population against the cumulative share of the
+    institutions.
+    - Gini: 1 - twice the area under the Lorenz curve (0: the institutions
+    follow the population, 1: all of them in a district with nobody).
+    - Theil T: sum of q ln(q / s). Decomposed by continent into a between
+    part (Europe against Anatolia) and a within part (among the districts of
+    each side): T = between + within.
+    - Theil L (mean log deviation): sum of s ln(s / q), decomposed the same
+    way. It is infinite when a district has none of the type, which is most
+    types, so it is computed with half an institution added to every
+    district (zero_adjustment). Theil T needs no adjustment.
+    - Location quotient: q / s, the institutions per person of a district
+    against those of Istanbul. With base = "institutions", the classic
+    quotient: the share of the type among the district's institutions
+    against its share in Istanbul.
+
+Each type is a column of one district x type count matrix (from the count
+cube, count_cube.py), plus an "All" column for all the institutions. Every
+measure is computed for all the columns at once with array operations: the
+Lorenz curves come from one argsort along the districts, the continent sums
+from one product with a district x continent indicator matrix.
+
+The results for the cleaned data are memoized and cached on disk (see
+data_access.py) for the figures: inequality_summary(), lorenz_curves() and
+location_quotient_table(). The cache files are keyed on this file as well
+as the data, so changing a metric here does not serve the old results.
+
+--------------------------------
+"""
+
+#%% --- Import required packages ---
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from data_access import (count_cube, districts, district_covariates, cached_frame,
+                         health_source, districts_source, code_sources)
+import project_paths
+
+#%% --- The inputs ---
+
+def district_type_counts(cube, district_index, group_axis = "institution_type_eng"):
+    """The district x type count matrix, with an "All" column.
+
+    Arguments:
+        cube (count_cube.CountCube): The counts.
+        district_index (array-like): The districts (district_eng), in order.
+        group_axis (str): The cube axis of the columns.
+
+    Returns:
+        pandas.DataFrame: The counts.
+    """
+    counts = cube.table("district_eng", group_axis).reindex(pd.Index(district_index, name = "district_eng"),
+                                                            fill_value = 0)
+    counts.columns = counts.columns.astype(str)
+    counts.loc[:,"All"] = counts.sum(axis = 1)
+    return counts
+
+
+def inequality_inputs(cube = None, district_layer = None, covariates = None):
+    #The counts, the population and the continent of every district, in the same order
+    cube = cube or count_cube()
+    district_layer = district_layer if district_layer is not None else districts()
+    covariates = covariates if covariates is not None else district_covariates()
+
+    district_info = (covariates.set_index("district_eng").loc[:,["population"]]
+                     .join(district_layer.set_index("district_e").loc[:,["continent"]], how = "inner"))
+    counts = district_type_counts(cube, district_info.index)
+    return counts, district_info.loc[:,"population"], district_info.loc[:,"continent"]
+
+
+def shares(counts, population):
+    #Population share of each district (n,) and institution share of each
+    #district in each column (n, k). A column with no institutions gets NaN.
+    counts = np.asarray(counts, dtype = "float64")
+    population = np.asarray(population, dtype = "float64")
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return population / population.sum(), counts / counts.sum(axis = 0)
+
+#%% --- Lorenz curves and Gini ---
+
+def lorenz_points(counts, population):
+    """The Lorenz curve of every column.
+
+    Arguments:
+        counts (numpy.ndarray): (n districts, k types) counts.
+        population (numpy.ndarray): (n,) population.
+
+    Returns:
+        tuple: (order, population_share, institution_share), each (n + 1, k)
+            but order (n, k). order holds the districts sorted by
+            institutions per person; the shares are cumulative and start
+            at 0.
+    """
+    s, q = shares(counts, population)
+    #Sorting by q / s is sorting by institutions per person
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        order = np.argsort(q / s[:,np.newaxis], axis = 0, kind = "stable")
+
+    zeros = np.zeros((1, q.shape[1]))
+    population_share = np.vstack([zeros, np.cumsum(s[order], axis = 0)])
+    institution_share = np.vstack([zeros, np.cumsum(np.take_along_axis(q, order, axis = 0), axis = 0)])
+    return order, population_share, institution_share
+
+
+def gini(counts, population):
+    """Population-weighted Gini of every column (trapezoids under the Lorenz curve)."""
+    _, population_share, institution_share = lorenz_points(counts, population)
+    areas = np.diff(population_share, axis = 0) * (institution_share[1:] + institution_share[:-1])
+    return 1 - areas.sum(axis = 0)
+
+#%% --- Theil ---
+
+def plogp_ratio(a, b):
+    #a ln(a / b), with 0 ln(0 / b) = 0
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return np.where(a > 0, a * np.log(a / b), 0.0)
+
+
+def theil(counts, population, groups, zero_adjustment = 0.5):
+    """Theil T and L of every column, decomposed into between and within groups.
+
+    Arguments:
+        counts (numpy.ndarray): (n districts, k types) counts.
+        population (numpy.ndarray): (n,) population.
+        groups (array-like): (n,) group of each district (the continent).
+        zero_adjustment (float): Added to every count for Theil L only. 0
+            gives the unadjusted L, NaN for the columns where a district
+            has none.
+
+    Returns:
+        dict: theil_t, theil_t_between, theil_t_within and the same for
+            theil_l, each a (k,) array. All of them are NaN for a column
+            with no institutions.
+    """
+    counts = np.asarray(counts, dtype = "float64")
+    s, q = shares(counts, population)
+    s = s[:,np.newaxis]
+    _, adjusted_q = shares(counts + zero_adjustment, population)
+
+    #Sums of the shares over each group, handed back to its districts
+    labels, codes = np.unique(np.asarray(groups), return_inverse = True)
+    indicator = (codes.ravel()[:,np.newaxis] == np.arange(len(labels))).astype("float64")
+
+    group_s = indicator.T @ s
+    district_s = indicator @ group_s
+
+    #The within parts compare each district to its own group
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        group_q, group_adjusted_q = indicator.T @ q, indicator.T @ adjusted_q
+        district_q, district_adjusted_q = indicator @ group_q, indicator @ group_adjusted_q
+        theil_t = (plogp_ratio(q, s).sum(axis = 0),
+                   plogp_ratio(group_q, group_s).sum(axis = 0),
+                   plogp_ratio(q, s * district_q / district_s).sum(axis = 0))
+        theil_l = (plogp_ratio(s, adjusted_q).sum(axis = 0),
+                   plogp_ratio(group_s, group_adjusted_q).sum(axis = 0),
+                   plogp_ratio(s, adjusted_q * district_s / district_adjusted_q).sum(axis = 0))
+
+    #Undefined: no institutions at all, or (for L) a district with none
+    no_institutions = counts.sum(axis = 0) == 0
+    undefined_l = no_institutions | (adjusted_q == 0).any(axis = 0)
+    return {"theil_t": np.where(no_institutions, np.nan, theil_t[0]),
+            "theil_t_between": np.where(no_institutions, np.nan, theil_t[1]),
+            "theil_t_within": np.where(no_institutions, np.nan, theil_t[2]),
+            "theil_l": np.where(undefined_l, np.nan, theil_l[0]),
+            "theil_l_between": np.where(undefined_l, np.nan, theil_l[1]),
+            "theil_l_within": np.where(undefined_l, np.nan, theil_l[2])}
+
+#%% --- Location quotients ---
+
+def location_quotients(counts, population, base = "population"):
+    """Location quotient of every district and column.
+
+    Arguments:
+        counts (numpy.ndarray): (n districts, k types) counts.
+        population (numpy.ndarray): (n,) population.
+        base (str): "population": institutions per person of the district
+            against Istanbul's. "institutions": share of the type among
+            the district's institutions against its share in Istanbul (the
+            counts must then hold the types only, without "All").
+
+    Returns:
+        numpy.ndarray: (n, k) location quotients.
+    """
+    counts = np.asarray(counts, dtype = "float64")
+    if base == "population":
+        reference = np.asarray(population, dtype = "float64")
+    elif base == "institutions":
+        reference = counts.sum(axis = 1)
+    else:
+        raise ValueError("base is population or institutions, not {}".format(base))
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return (counts / reference[:,np.newaxis]) / (counts.sum(axis = 0) / reference.sum())
+
+#%% --- The inequality stage ---
+
+def inequality_metrics(counts, population, continent, zero_adjustment = 0.5):
+    """Gini and the Theil decompositions of every type.
+
+    Theil L is computed with zero_adjustment institutions added to every
+    district (see theil), so that it is defined for the types some districts
+    have none of. Gini and Theil T use the counts as they are.
+
+    Arguments:
+        counts (pandas.DataFrame): district x type counts.
+        population, continent (pandas.Series): Of the same districts.
+        zero_adjustment (float): See theil.
+
+    Returns:
+        pandas.DataFrame: One row per type with n_institutions, gini,
+            theil_t (between, within) and theil_l (between, within).
+    """
+    summary = pd.DataFrame({"n_institutions": counts.sum(axis = 0).to_numpy(),
+                            "gini": gini(counts, population),
+                            **theil(counts.to_numpy(), population.to_numpy(), continent.to_numpy(),
+                                    zero_adjustment)},
+                           index = pd.Index(counts.columns, name = "institution_type_eng"))
+    return summary.reset_index()
+
+
+def lorenz_table(counts, population):
+    """The Lorenz curves of every type, one row per point (rank 0 is the origin)."""
+    order, population_share, institution_share = lorenz_points(counts, population)
+    n, k = order.shape
+    districts_in_order = np.vstack([np.full((1, k), None, dtype = object), counts.index.to_numpy()[order]])
+
+    return pd.DataFrame({"institution_type_eng": np.tile(counts.columns.to_numpy(), n + 1),
+                         "rank": np.repeat(np.arange(n + 1), k),
+                         "district_eng": districts_in_order.ravel(),
+                         "population_share": population_share.ravel(),
+                         "institution_share": institution_share.ravel()})
+
+
+def location_quotient_frame(counts, population):
+    """Location quotients of every district and type, both bases, in long format."""
+    per_person = location_quotients(counts, population)
+    #The classic quotient of "All" would always be 1: left NaN
+    types = counts.drop(columns = "All")
+    classic = (pd.DataFrame(location_quotients(types, population, base = "institutions"),
+                            index = counts.index, columns = types.columns)
+               .reindex(columns = counts.columns))
+
+    return pd.DataFrame({"district_eng": np.repeat(counts.index.to_numpy(), counts.shape[1]),
+                         "institution_type_eng": np.tile(counts.columns.to_numpy(), len(counts)),
+                         "count": counts.to_numpy().ravel(),
+                         "location_quotient": per_person.ravel(),
+                         "location_quotient_of_institutions": classic.to_numpy().ravel()})
+
+#%% --- Memoized and cached results ---
+
+@lru_cache(maxsize = None)
+def inequality_table(name):
+    builders = {"inequality_summary": inequality_metrics,
+                "lorenz_curves": lambda counts, population, continent: lorenz_table(counts, population),
+                "location_quotients": lambda counts, population, continent: location_quotient_frame(counts, population)}
+    #This file is a source too: changing a metric gives a new cache file
+    sources = [health_source(), districts_source(), project_paths.district_income_fp, __file__] + code_sources
+    return cached_frame(name, sources, lambda: builders[name](*inequality_inputs()))
+
+
+def inequality_summary():
+    """inequality_metrics of the cleaned data (a copy)."""
+    return inequality_table("inequality_summary").copy()
+
+
+def lorenz_curves():
+    """lorenz_table of the cleaned data (a copy)."""
+    return inequality_table("lorenz_curves").copy()
+
+
+def location_quotient_table():
+    """location_quotient_frame of the cleaned data (a copy)."""
+    return inequality_table("location_quotients").copy()
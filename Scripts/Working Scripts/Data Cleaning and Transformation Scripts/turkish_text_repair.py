@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:40 2026
+
+@author: ejgen
+
+------ What's this file? ------
+
+This module contains the mojibake repair stage of the raw data cleaner.
+
+The municipality exports its files with Turkish letters that were written
+as Windows-1254 but read back as Latin-1. The six letters that differ between
+the two code pages come out as ý þ ð Ý Þ Ð instead of ı ş ğ İ Ş Ğ.
+
+Instead of running one str.replace per bad letter per column, every column
+goes through a single str.translate call with one translation table. On top
+of that, the repair runs once per unique value and is mapped back onto the
+column, so the cost grows with the number of distinct names, not with rows.
+
+--------------------------------
+"""
+
+#%% --- Translation table ---
+
+#Latin-1 letter -> the Windows-1254 letter that was meant to be there.
+#"ý" is repaired to a dotted "i" on purpose: every downstream type list
+#(e.g. "Aile Sağliği Merkezi", "Tip Merkezi") and the cleaned dataset were
+#built on that spelling.
+MOJIBAKE_LETTERS = {"ý": "i", "þ": "ş", "ð": "ğ",
+                    "Ý": "İ", "Þ": "Ş", "Ð": "Ğ"}
+
+MOJIBAKE_TABLE = str.maketrans(MOJIBAKE_LETTERS)
+
+#Case options that can be applied before the repair
+CASE_METHODS = {None: lambda text: text,
+                "capitalize": lambda text: text.lower().capitalize(),
+                "title": lambda text: text.lower().title()}
+
+#%% --- Repair functions ---
+
+def repair_text(text, case = None):
+    """Repair the mojibake letters of a single string.
+
+    Arguments:
+        text (str): The string to repair.
+        case (str): None, "capitalize" or "title". The case change is
+            applied BEFORE the translation. This is what solves the
+            capital I problem: "Ý" stays a single letter while it is lowered
+            and title-cased, and only becomes "İ" at the very end. Lowering
+            a real "İ" would split it into "i" + a combining dot.
+
+    Returns:
+        str: The repaired string.
+    """
+    return CASE_METHODS[case](text).translate(MOJIBAKE_TABLE)
+
+
+def repair_column(column, case = None):
+    """Repair every value of a pandas series in one translation pass.
+
+    Arguments:
+        column (pandas.Series): A column of strings. NaN values are kept.
+        case (str): See repair_text.
+
+    Returns:
+        pandas.Series: The repaired column, with the same index.
+    """
+    #Repair each distinct value once, then map the results back
+    unique_values = column.dropna().unique()
+    repaired_values = {value: repair_text(value, case) for value in unique_values}
+
+    return column.map(repaired_values)
+
+
+def repair_columns(dataframe, columns, case = None):
+    """Repair several columns of a dataframe in place.
+
+    Arguments:
+        dataframe (pandas.DataFrame): The dataframe to repair.
+        columns (list): Names of the columns to repair.
+        case (str): See repair_text.
+
+    Returns:
+        pandas.DataFrame: The same dataframe, for chaining.
+    """
+    for column in columns:
+        dataframe.loc[:,column] = repair_column(dataframe.loc[:,column], case)
+
+    return dataframe
+
+#%% --- Turkish casing ---
+
+#str.lower() and str.upper() do not know about the dotted / dotless i of
+#Turkish: "İ".lower() gives "i" + a combining dot and "I".lower() gives "i"
+#instead of "ı". These tables handle the two letters before the generic call.
+TURKISH_LOWER_TABLE = str.maketrans({"I": "ı", "İ": "i"})
+TURKISH_UPPER_TABLE = str.maketrans({"i": "İ", "ı": "I"})
+
+def turkish_capitalize(text):
+    """Capitalize a (correctly encoded) Turkish string.
+
+    Arguments:
+        text (str): e.g. "ŞİŞLİ" from the administrative borders data.
+
+    Returns:
+        str: e.g. "Şişli".
+    """
+    lowered = text.translate(TURKISH_LOWER_TABLE).lower()
+    return lowered[:1].translate(TURKISH_UPPER_TABLE).upper() + lowered[1:]